@@ -5,6 +5,8 @@ set -o nounset
 
 python manage.py migrate --noinput
 
+python manage.py createcachetable
+
 python manage.py add_suppliers
 
 echo
@@ -13,6 +13,12 @@ python manage.py migrate --noinput
 
 echo "Migrations completed"
 
+python manage.py createcachetable
+
+python manage.py manage_partitions
+
+echo "Partitions check completed"
+
 python manage.py add_suppliers
 
 echo "Suppliers check completed"
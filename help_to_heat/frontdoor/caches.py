@@ -0,0 +1,119 @@
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+_missing = object()
+
+
+class SharedCacheRouter:
+    # the shared cache's DatabaseCache reads and writes through the "cache" connection, which isn't in a transaction
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == "django_cache":
+            return "cache"
+        return None
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_read(model, **hints)
+
+
+class TieredCache:
+    """
+    A cache in each worker's memory in front of a cache shared by every worker.
+
+    Reads try the local cache, then the shared one, filling the local cache from the shared one on the way back.
+    Both caches evict their oldest entries once they hold more than their configured MAX_ENTRIES.
+    """
+
+    def __init__(self, prefix, local_alias="default", shared_alias="shared"):
+        self.prefix = prefix
+        self.local_alias = local_alias
+        self.shared_alias = shared_alias
+        self.lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _get_key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def get(self, key, local_timeout):
+        key = self._get_key(key)
+        value = caches[self.local_alias].get(key, _missing)
+        if value is not _missing:
+            self._count("local_hits")
+            return value
+
+        try:
+            value = caches[self.shared_alias].get(key, _missing)
+        except Exception:  # noqa: B902
+            # the shared cache being unavailable shouldn't stop the lookup it's in front of
+            logger.exception("Unable to read from the shared cache")
+            value = _missing
+        if value is _missing:
+            self._count("misses")
+            return None
+
+        self._count("shared_hits")
+        caches[self.local_alias].set(key, value, local_timeout)
+        return value
+
+    def set(self, key, value, timeout, local_timeout):
+        key = self._get_key(key)
+        caches[self.local_alias].set(key, value, local_timeout)
+        try:
+            caches[self.shared_alias].set(key, value, timeout)
+        except Exception:  # noqa: B902
+            logger.exception("Unable to write to the shared cache")
+
+    def _count(self, counter):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def info(self):
+        with self.lock:
+            return {"local_hits": self.local_hits, "shared_hits": self.shared_hits, "misses": self.misses}
+
+    def reset_info(self):
+        with self.lock:
+            self.local_hits = 0
+            self.shared_hits = 0
+            self.misses = 0
+
+
+postcode_address_cache = TieredCache("postcode-addresses")
+
+
+def normalise_postcode(postcode):
+    return re.sub(r"\s+", "", postcode).upper()
+
+
+def get_cached_addresses(postcode):
+    """
+    Returns
+    -------
+    Tuple[list, bool]
+        The OS Places results last fetched for the postcode, and whether they're older than ADDRESS_CACHE_TTL.
+        The results are None if the postcode isn't cached.
+    """
+    entry = postcode_address_cache.get(normalise_postcode(postcode), settings.LOCAL_CACHE_TTL)
+    if entry is None:
+        return None, False
+    is_stale = time.time() - entry["fetched_at"] > settings.ADDRESS_CACHE_TTL
+    return entry["results"], is_stale
+
+
+def cache_addresses(postcode, results):
+    # entries are kept past ADDRESS_CACHE_TTL so they can still be used while OS Places is unavailable
+    entry = {"fetched_at": time.time(), "results": results}
+    postcode_address_cache.set(
+        normalise_postcode(postcode),
+        entry,
+        timeout=settings.ADDRESS_CACHE_STALE_TTL,
+        local_timeout=settings.LOCAL_CACHE_TTL,
+    )
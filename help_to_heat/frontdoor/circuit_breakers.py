@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+closed = "closed"
+opened = "open"
+half_open = "half-open"
+
+
+class CircuitOpenException(requests.exceptions.RequestException):
+    # a RequestException so everything already falling back when an API fails also falls back for this
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a dependency that keeps failing, so they fail straight away rather than each waiting to time out.
+
+    The breaker opens after failure_threshold failures in a row, where a call fails if it raises, returns a server
+    error or takes longer than slow_call_seconds. Once it has been open for reset_seconds a single call is let through
+    as a probe, which closes the breaker if it succeeds and opens it again if it doesn't.
+    """
+
+    def __init__(self, name, failure_threshold, slow_call_seconds, reset_seconds, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.state = closed
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def before_call(self):
+        with self.lock:
+            if self.state == opened and self.clock() - self.opened_at >= self.reset_seconds:
+                self._set_state(half_open)
+            if self.state == opened or (self.state == half_open and self.probing):
+                raise CircuitOpenException(f"The circuit breaker for {self.name} is open")
+            if self.state == half_open:
+                self.probing = True
+
+    def record_call(self, duration, failed):
+        failed = failed or duration > self.slow_call_seconds
+        with self.lock:
+            self.probing = False
+            if not failed:
+                self.failures = 0
+                if self.state != closed:
+                    self._set_state(closed)
+                return
+
+            self.failures += 1
+            if self.state == half_open or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+                self._set_state(opened)
+
+    def _set_state(self, state):
+        if state == opened:
+            logger.error(f"The circuit breaker for {self.name} has opened after {self.failures} failed calls")
+        else:
+            logger.info(f"The circuit breaker for {self.name} is now {state}")
+        self.state = state
+
+
+_circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name):
+    with _circuit_breakers_lock:
+        if name not in _circuit_breakers:
+            _circuit_breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                slow_call_seconds=settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS,
+                reset_seconds=settings.CIRCUIT_BREAKER_RESET_SECONDS,
+            )
+        return _circuit_breakers[name]
+
+
+def get_circuit_breaker_states():
+    """The state of each dependency's breaker in this worker"""
+    with _circuit_breakers_lock:
+        return {name: breaker.state for name, breaker in _circuit_breakers.items()}
+
+
+def reset_circuit_breakers():
+    with _circuit_breakers_lock:
+        _circuit_breakers.clear()
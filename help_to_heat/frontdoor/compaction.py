@@ -0,0 +1,172 @@
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef, Q
+
+from help_to_heat import portal
+
+from . import models
+
+_superseded_answers_checkpoint = "superseded-answers"
+_commit_delay_allowance = datetime.timedelta(hours=1)
+
+
+class CompactionReport:
+    def __init__(self):
+        self.rows = {}
+        self.bytes = {}
+
+    def add(self, name, rows, size):
+        self.rows[name] = self.rows.get(name, 0) + rows
+        self.bytes[name] = self.bytes.get(name, 0) + size
+
+    def lines(self):
+        return [f"{name}: {self.rows[name]} rows, ~{self.bytes[name]} bytes" for name in self.rows]
+
+
+def _data_size(data):
+    # an approximation of what the row costs, postgres stores jsonb a little differently
+    return len(json.dumps(data, cls=DjangoJSONEncoder))
+
+
+def _page_session_ids(answers, batch_size):
+    """The session ids of the answers, batch_size at a time in order, without reading them all at once"""
+    session_ids = answers.order_by("session_id").values_list("session_id", flat=True).distinct()
+    last_session_id = None
+    while True:
+        page = session_ids if last_session_id is None else session_ids.filter(session_id__gt=last_session_id)
+        session_id_batch = list(page[:batch_size])
+        if not session_id_batch:
+            return
+        last_session_id = session_id_batch[-1]
+        yield session_id_batch
+
+
+def _referred_session_ids():
+    return portal.models.Referral.objects.filter(session_id__isnull=False).values("session_id")
+
+
+def _has_repeated_pages():
+    # checked for each session found rather than across every answer
+    return Exists(
+        models.Answer.objects.filter(session_id=OuterRef("session_id"))
+        .values("page_name")
+        .annotate(answer_count=Count("id"))
+        .filter(answer_count__gt=1)
+    )
+
+
+def get_superseded_answer_ids(answers):
+    """
+    Find the answers whose every field has been overwritten by a later answer on the same page.
+
+    Parameters
+    ----------
+    answers
+        The answers for a single session, ordered by created_at
+
+    Returns
+    -------
+    The ids of the answers that can be removed without changing what the session reads back
+    """
+    superseded_ids = []
+    later_fields_by_page = {}
+    for answer in reversed(answers):
+        later_fields = later_fields_by_page.setdefault(answer.page_name, set())
+        if later_fields and later_fields.issuperset(answer.data.keys()):
+            superseded_ids.append(answer.id)
+        else:
+            later_fields.update(answer.data.keys())
+    return superseded_ids
+
+
+def compact_superseded_answers(stale_before, batch_size, report, dry_run=False):
+    # only sessions that have been referred or have gone quiet, the user might still be partway through the others
+    # sessions that had gone quiet by the last run have been compacted already, so only answers since then are scanned
+    checkpoint = models.CompactionCheckpoint.objects.filter(name=_superseded_answers_checkpoint).first()
+    answers = models.Answer.objects.all()
+    if checkpoint:
+        # allowing for answers committed a little after they were created
+        answers = answers.filter(created_at__gte=checkpoint.checked_before - _commit_delay_allowance)
+    for session_id_batch in _page_session_ids(answers, batch_size):
+        session_ids = (
+            answers.filter(session_id__in=session_id_batch)
+            .values("session_id")
+            .annotate(last_answered_at=Max("created_at"))
+            .filter(Q(last_answered_at__lt=stale_before) | Q(session_id__in=_referred_session_ids()))
+            .filter(_has_repeated_pages())
+            .values_list("session_id", flat=True)
+        )
+        with transaction.atomic():
+            for session_id in session_ids:
+                session_answers = list(models.Answer.objects.filter(session_id=session_id).order_by("created_at"))
+                superseded_ids = set(get_superseded_answer_ids(session_answers))
+                if not superseded_ids:
+                    continue
+                size = sum(_data_size(answer.data) for answer in session_answers if answer.id in superseded_ids)
+                report.add("superseded answers", len(superseded_ids), size)
+                if not dry_run:
+                    models.Answer.objects.filter(id__in=superseded_ids).delete()
+
+    if not dry_run:
+        models.CompactionCheckpoint.objects.update_or_create(
+            name=_superseded_answers_checkpoint, defaults={"checked_before": stale_before}
+        )
+
+
+def delete_abandoned_sessions(abandoned_before, batch_size, report, archive_file=None, dry_run=False):
+    answers = models.Answer.objects.filter(created_at__lt=abandoned_before).exclude(
+        session_id__in=_referred_session_ids()
+    )
+    for session_id_batch in _page_session_ids(answers, batch_size):
+        with transaction.atomic():
+            # saving an answer locks the session's snapshot, so the user can't come back part way through the delete
+            snapshots = list(models.SessionSnapshot.objects.select_for_update().filter(session_id__in=session_id_batch))
+            # anything saved after the cutoff means the user has come back, so leave those sessions alone
+            abandoned_session_ids = set(
+                models.Answer.objects.filter(session_id__in=session_id_batch)
+                .values("session_id")
+                .annotate(last_answered_at=Max("created_at"))
+                .filter(last_answered_at__lt=abandoned_before)
+                .values_list("session_id", flat=True)
+            )
+            if not abandoned_session_ids:
+                continue
+            answers = models.Answer.objects.filter(session_id__in=abandoned_session_ids)
+            answers = list(answers.order_by("session_id", "created_at"))
+            report.add("abandoned answers", len(answers), sum(_data_size(answer.data) for answer in answers))
+            snapshots = [snapshot for snapshot in snapshots if snapshot.session_id in abandoned_session_ids]
+            report.add("abandoned snapshots", len(snapshots), sum(_data_size(snapshot.data) for snapshot in snapshots))
+            if dry_run:
+                continue
+            if archive_file:
+                for answer in answers:
+                    _archive(archive_file, "answer", answer, page_name=answer.page_name, session_id=answer.session_id)
+            models.Answer.objects.filter(id__in=[answer.id for answer in answers]).delete()
+            models.SessionSnapshot.objects.filter(session_id__in=abandoned_session_ids).delete()
+
+
+def prune_events(created_before, batch_size, report, archive_file=None, dry_run=False):
+    events = models.Event.objects.filter(created_at__lt=created_before).order_by("id")
+    last_id = None
+    while True:
+        batch_events = events if last_id is None else events.filter(id__gt=last_id)
+        batch = list(batch_events[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        report.add("events", len(batch), sum(_data_size(event.data) for event in batch))
+        if dry_run:
+            continue
+        with transaction.atomic():
+            if archive_file:
+                for event in batch:
+                    _archive(archive_file, "event", event, name=event.name)
+            models.Event.objects.filter(id__in=[event.id for event in batch]).delete()
+
+
+def _archive(archive_file, kind, row, **fields):
+    line = {"kind": kind, "id": row.id, "created_at": row.created_at, **fields, "data": row.data}
+    archive_file.write(json.dumps(line, cls=DjangoJSONEncoder) + "\n")
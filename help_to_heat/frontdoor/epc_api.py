@@ -1,13 +1,23 @@
+import hashlib
 import logging
 import urllib.parse
 
-import requests
 from django.conf import settings
 
-from help_to_heat.utils import default_api_timeout
+from . import http_client
+from .caches import TieredCache, normalise_postcode
 
 logger = logging.getLogger(__name__)
 
+certificate_cache = TieredCache("epc-certificate")
+recommendations_cache = TieredCache("epc-recommendations")
+search_cache = TieredCache("epc-search")
+
+
+def _get_cache_key(*parts):
+    # the parts come from what the user entered, so are hashed into something safe to use as a key
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
 
 class EPCApi:
     def _basic_auth_header(self):
@@ -17,23 +27,35 @@ class EPCApi:
     def search_epc_details(self, building, postcode):
         params = urllib.parse.urlencode({"postcode": postcode, "address": building})
         url = f"{settings.OPEN_EPC_API_BASE_URL}/search?{params}"
-        return self.__api_call(url)
+        key = _get_cache_key(normalise_postcode(postcode), building.strip().lower())
+        return self.__cached_api_call(search_cache, key, settings.EPC_SEARCH_CACHE_TTL, url)
 
     # see help_to_heat/frontdoor/mock_epc_api_data/sample_epc_response.json for example format
     def get_epc_details(self, lmk):
         lmk_for_path = urllib.parse.quote(lmk)
         url = f"{settings.OPEN_EPC_API_BASE_URL}/certificate/{lmk_for_path}"
-        return self.__api_call(url)
+        return self.__cached_api_call(certificate_cache, _get_cache_key(lmk), settings.EPC_CERTIFICATE_CACHE_TTL, url)
 
     # see help_to_heat/frontdoor/mock_epc_api_data/sample_epc_recommendations_response.json for example format
     def get_epc_recommendations(self, lmk):
         lmk_for_path = urllib.parse.quote(lmk)
         url = f"{settings.OPEN_EPC_API_BASE_URL}/recommendations/{lmk_for_path}"
-        return self.__api_call(url)
+        return self.__cached_api_call(
+            recommendations_cache, _get_cache_key(lmk), settings.EPC_CERTIFICATE_CACHE_TTL, url
+        )
+
+    def __cached_api_call(self, cache, key, timeout, url):
+        # only responses with content are cached, errors raise before getting here
+        response = cache.get(key, settings.LOCAL_CACHE_TTL)
+        if response is None:
+            response = self.__api_call(url)
+            if response is not None:
+                cache.set(key, response, timeout=timeout, local_timeout=settings.LOCAL_CACHE_TTL)
+        return response
 
     def __api_call(self, url):
         headers = self._basic_auth_header()
-        response = requests.get(url, headers=headers, timeout=default_api_timeout)
+        response = http_client.get("epc", url, headers=headers)
         response.raise_for_status()
         if len(response.content) == 0:
             return None
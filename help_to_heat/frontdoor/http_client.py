@@ -0,0 +1,85 @@
+import functools
+import http.cookiejar
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+from . import circuit_breakers
+
+os_api_base_url = "https://api.os.uk/"
+
+# only failures that a moment later might not repeat, the OS API's 429s are handled by moving on to the next key
+retry_statuses = (502, 503, 504)
+
+
+def _get_endpoint_base_urls():
+    return {
+        "epc": settings.OPEN_EPC_API_BASE_URL,
+        "os": os_api_base_url,
+    }
+
+
+def _make_adapter(retries):
+    retry = Retry(
+        total=retries,
+        # a read that timed out has already waited the whole timeout, retrying it would multiply how long a call can
+        # take, so only failed connects (once) and the statuses below are retried
+        connect=min(retries, 1),
+        read=False,
+        backoff_factor=0.2,
+        status_forcelist=retry_statuses,
+        allowed_methods=("GET",),
+        # hand back the last response rather than raising, callers already check the status with raise_for_status
+        raise_on_status=False,
+    )
+    return HTTPAdapter(
+        pool_connections=settings.OUTBOUND_HTTP_POOL_SIZE,
+        pool_maxsize=settings.OUTBOUND_HTTP_POOL_SIZE,
+        max_retries=retry,
+    )
+
+
+@functools.cache
+def get_session():
+    """
+    The session every outbound request is made through, so connections are kept alive and reused between requests.
+
+    Each endpoint is mounted with its own adapter, which keeps a pool of connections per host. Under eventlet the
+    pools are shared by every green thread in the worker, which is safe because the pools hand out each connection
+    to one request at a time. Cookies are the only other state a session keeps between requests, so none are kept.
+    """
+    session = requests.Session()
+    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    for endpoint, base_url in _get_endpoint_base_urls().items():
+        session.mount(base_url, _make_adapter(settings.OUTBOUND_HTTP_RETRIES[endpoint]))
+    return session
+
+
+def get(endpoint, url, **kwargs):
+    """
+    Parameters
+    ----------
+    endpoint : str
+        One of the endpoints configured in OUTBOUND_HTTP_TIMEOUTS, which sets how long to wait for it
+    url : str
+        The full url to request
+
+    Raises
+    ------
+    CircuitOpenException
+        If the endpoint has been failing, without making the request
+    """
+    circuit_breaker = circuit_breakers.get_circuit_breaker(endpoint)
+    circuit_breaker.before_call()
+
+    start = time.monotonic()
+    try:
+        response = get_session().get(url, timeout=settings.OUTBOUND_HTTP_TIMEOUTS[endpoint], **kwargs)
+    except requests.exceptions.RequestException:
+        circuit_breaker.record_call(time.monotonic() - start, failed=True)
+        raise
+    circuit_breaker.record_call(time.monotonic() - start, failed=response.status_code >= 500)
+    return response
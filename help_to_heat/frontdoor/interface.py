@@ -1,18 +1,20 @@
-import ast
+import concurrent.futures
+import datetime
+import functools
 import logging
 import time
-from http import HTTPStatus
 
 import marshmallow
-import osdatahub
-import requests
 from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
 from requests import RequestException
 
 from help_to_heat import portal
 from help_to_heat.utils import Entity, Interface, register_event, with_schema
 
-from . import models, schemas
+from . import caches, models, schemas
 from .consts import (
     all_pages,
     alternative_supplier_field,
@@ -22,7 +24,9 @@ from .consts import (
     epc_accept_suggested_epc_field_not_found,
     epc_rating_field,
     epc_rating_field_not_found,
+    epc_select_page,
     field_yes,
+    lmk_field,
     loft_access_field,
     loft_access_field_no_loft,
     loft_field,
@@ -35,6 +39,7 @@ from .consts import (
     property_subtype_field,
     property_type_field,
     property_type_field_park_home,
+    recommendations_field,
     supplier_field,
     supplier_field_bulb,
     supplier_field_eon_next,
@@ -43,10 +48,13 @@ from .consts import (
     supplier_field_shell,
     supplier_field_utility_warehouse,
     supplier_page,
+    uprn_field,
 )
 from .epc_api import EPCApi
 from .os_api import OSApi, ThrottledApiException
 from .routing import calculate_journey
+from .session_cache import cached_session_read, invalidates_session_cache
+from .session_stores import get_session_store
 
 logger = logging.getLogger(__name__)
 
@@ -93,6 +101,7 @@ class FindAddressesSchema(marshmallow.Schema):
 
 class GetAddressSchema(marshmallow.Schema):
     uprn = marshmallow.fields.String()
+    postcode = marshmallow.fields.String(allow_none=True)
 
 
 class GetEPCSchema(marshmallow.Schema):
@@ -106,6 +115,7 @@ class AddressSchema(marshmallow.Schema):
     town = marshmallow.fields.String()
     postcode = marshmallow.fields.String()
     local_custodian_code = marshmallow.fields.String()
+    address = marshmallow.fields.String()
 
 
 class FullAddressSchema(marshmallow.Schema):
@@ -133,38 +143,84 @@ class SuccessSchema(marshmallow.Schema):
     success = marshmallow.fields.Boolean()
 
 
+@functools.cache
+def _get_epc_executor():
+    # shared by every request in the worker, so lookups that miss their deadline don't hold up the request
+    return concurrent.futures.ThreadPoolExecutor(max_workers=settings.EPC_API_MAX_CONCURRENT_REQUESTS)
+
+
+@functools.cache
+def _get_recommendations_executor():
+    # kept apart from the certificate lookups, so fetches waiting to retry while the EPC API is down can't hold up
+    # lookups that users are waiting on
+    return concurrent.futures.ThreadPoolExecutor(max_workers=settings.EPC_RECOMMENDATIONS_MAX_CONCURRENT_FETCHES)
+
+
 def get_addresses_from_api(postcode):
+    cached_results, is_stale = caches.get_cached_addresses(postcode)
+    if cached_results is not None and not is_stale:
+        return cached_results
+
+    try:
+        api_results = _get_addresses_from_api(postcode)
+    except ThrottledApiException:
+        if cached_results is None:
+            raise
+        logger.warning("The OS API usage limit has been hit, using previously fetched addresses")
+        return cached_results
+
+    if api_results is None:
+        return cached_results or []
+
+    caches.cache_addresses(postcode, api_results)
+    return api_results
+
+
+def _get_addresses_from_api(postcode):
+    # None if OS Places couldn't be reached, so failures aren't cached as a postcode with no addresses
     max_results_number = 100
-    offset = 0
+    os_api = OSApi(settings.OS_API_KEY)
 
-    json_response = OSApi(settings.OS_API_KEY).get_by_postcode(postcode, offset, max_results_number)
+    json_response = os_api.get_by_postcode(postcode, 0, max_results_number)
     if not json_response:
-        return []
+        return None
 
     total_results_number = json_response["header"]["totalresults"]
     if total_results_number == 0:
         return []
-    api_results = json_response["results"]
-    api_results_all = api_results
+    api_results_all = list(json_response["results"])
 
     # We have a max result number (in this case 100) for each call.
-    # If we expect more than 100 results in total, we set the offset to 100 and request another 100 results.
-    # Repeat until all results are requested and return a full list of results.
-    if max_results_number < total_results_number:
-        requested_results_number = max_results_number
-        while requested_results_number < total_results_number:
-            offset = requested_results_number
+    # If we expect more than 100 results in total, the remaining pages are requested at the same time, one per offset.
+    offsets = range(max_results_number, total_results_number, max_results_number)
+    if offsets:
+        json_responses = _get_pages_from_api(os_api, postcode, offsets, max_results_number)
+        # the pages are only useful together, so if any of them failed the whole lookup has
+        if not all(json_responses):
+            return None
+        for json_response in json_responses:
+            api_results_all.extend(json_response["results"])
 
-            json_response = OSApi(settings.OS_API_KEY).get_by_postcode(postcode, offset, max_results_number)
-            if not json_response:
-                return []
+    return api_results_all
 
-            api_results = json_response["results"]
-            api_results_all.extend(api_results)
 
-            requested_results_number += max_results_number
+def _get_pages_from_api(os_api, postcode, offsets, max_results_number):
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(len(offsets), settings.OS_API_MAX_CONCURRENT_REQUESTS)
+    )
 
-    return api_results_all
+    def _get_page(offset):
+        try:
+            return os_api.get_by_postcode(postcode, offset, max_results_number)
+        finally:
+            # the key scheduler uses the database, close the thread's connections before the thread goes away
+            connections.close_all()
+
+    try:
+        # map returns the pages in the order of their offsets, and raises the first error any of them raised
+        return list(executor.map(_get_page, offsets))
+    finally:
+        executor.shutdown(cancel_futures=True)
 
 
 class SupplierConverter:
@@ -235,35 +291,24 @@ class SupplierConverter:
 class Session(Entity):
     @with_schema(load=SaveAnswerSchema, dump=schemas.SessionSchema)
     @register_event(models.Event, "Answer saved")
+    @invalidates_session_cache
     def save_answer(self, session_id, page_name, data):
-        answer = models.Answer.objects.create(
-            session_id=session_id,
-            page_name=page_name,
-            data=data,
-        )
-        return answer.data
+        return get_session_store().save_answer(session_id, page_name, data)
 
-    @with_schema(load=GetAnswerSchema, dump=schemas.SessionSchema)
+    @with_schema(load=GetAnswerSchema, dump=schemas.SessionSchema, trusted=True)
+    @cached_session_read
     def get_answer(self, session_id, page_name):
-        try:
-            answer = models.Answer.objects.filter(session_id=session_id, page_name=page_name).latest("created_at")
-            return answer.data
-        except models.Answer.DoesNotExist:
-            return {}
+        return get_session_store().get_answer(session_id, page_name)
 
-    @with_schema(load=GetPageAnswersSchema, dump=schemas.SessionSchema)
+    @with_schema(load=GetPageAnswersSchema, dump=schemas.SessionSchema, trusted=True)
+    @cached_session_read
     def get_page_answers(self, session_id, page_name):
-        page_answers = (
-            models.Answer.objects.filter(session_id=session_id, page_name=page_name).order_by("created_at").all()
-        )
-        answers = {k: v for a in page_answers for (k, v) in a.data.items()}
-        return answers
+        return get_session_store().get_page_answers(session_id, page_name)
 
-    @with_schema(load=GetSessionSchema, dump=schemas.SessionSchema)
+    @with_schema(load=GetSessionSchema, dump=schemas.SessionSchema, trusted=True)
+    @cached_session_read
     def get_session(self, session_id):
-        answers = models.Answer.objects.filter(session_id=session_id).order_by("created_at").all()
-        session = {k: v for a in answers for (k, v) in a.data.items()}
-        return session
+        return get_session_store().get_session(session_id)
 
     @with_schema(load=CreateReferralSchema, dump=ReferralSchema)
     @register_event(models.Event, "Referral created")
@@ -275,9 +320,11 @@ class Session(Entity):
 
         # filter to only answers given on the user's journey
         journey = calculate_journey(answers, confirm_and_submit_page)
+        answers_by_page = get_session_store().get_answers_by_page(session_id)
+        session_schema = schemas.SessionSchema()
         given_answers = {}
         for journey_page_name in journey:
-            page_answers = api.session.get_page_answers(session_id, journey_page_name)
+            page_answers = session_schema.dump(answers_by_page.get(journey_page_name, {}))
             given_answers = {**given_answers, **page_answers}
 
         # override property type of park home
@@ -327,6 +374,11 @@ class Address(Entity):
             if r.get("LPI") is not None and self.is_current_residential(r.get("LPI"))
         )
 
+        # the full address of each uprn is kept with it, so it doesn't need looking up again once one is selected
+        full_addresses = {}
+        for r in lpi_data:
+            full_addresses.setdefault(r["LPI"]["UPRN"], r["LPI"]["ADDRESS"])
+
         lpi_addresses = tuple(self.parse_lpi_to_address(r.get("LPI")) for r in lpi_data)
 
         uprns_to_use = tuple(address["uprn"] for address in lpi_addresses)
@@ -353,38 +405,28 @@ class Address(Entity):
                 ]
             )
 
+        joined_addresses = tuple(
+            {**address, "address": full_addresses[address["uprn"]]} for address in joined_addresses
+        )
+
         return joined_addresses[:10]
 
     @with_schema(load=GetAddressSchema, dump=FullAddressSchema)
-    def get_address(self, uprn):
-        logger = logging.getLogger(__name__)
-        api_keys = ast.literal_eval(settings.OS_API_KEY)
-        for index, key in enumerate(api_keys):
-            try:
-                api = osdatahub.PlacesAPI(key)
-            except requests.exceptions.HTTPError or requests.exceptions.RequestException as e:
-                status_code = e.response.status_code
-                if status_code == HTTPStatus.TOO_MANY_REQUESTS:
-                    logger.error(f"The OS API usage limit has been hit for API key at index {index}.")
-                    if index == len(api_keys) - 1:
-                        logger.error("The OS API usage limit has been hit for all API keys")
-                        raise ThrottledApiException
-                    else:
-                        continue
-
-                logger.exception("An error occurred while attempting to fetch addresses.")
-                break
-
-        try:
-            api_results = api.uprn(int(uprn), dataset="LPI")["features"]
-            address = api_results[0]["properties"]["ADDRESS"]
-            result = {"uprn": uprn, "address": address}
-            return result
-        except requests.exceptions.HTTPError or requests.exceptions.RequestException as e:
-            if e.response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-                raise ThrottledApiException
-            else:
-                raise e
+    def get_address(self, uprn, postcode=None):
+        address = self._get_cached_address(uprn, postcode) if postcode else None
+        if address is None:
+            api_results = OSApi(settings.OS_API_KEY).get_by_uprn(int(uprn), dataset="LPI")["results"]
+            address = api_results[0]["LPI"]["ADDRESS"]
+        result = {"uprn": uprn, "address": address}
+        return result
+
+    def _get_cached_address(self, uprn, postcode):
+        cached_results, _ = caches.get_cached_addresses(postcode)
+        for r in cached_results or ():
+            lpi = r.get("LPI")
+            if lpi is not None and lpi["UPRN"] == uprn:
+                return lpi["ADDRESS"]
+        return None
 
     def is_current_residential(self, lpi):
         return (
@@ -644,21 +686,138 @@ class EPC(Entity):
         }
 
     def get_address_and_epc_lmk(self, building_name_or_number, postcode):
+        # certificates loaded with load_epc_certificates are searched first. The Open EPC API is searched when none of
+        # them match, or when they were loaded more than EPC_LOCAL_CERTIFICATES_TTL seconds ago and newer certificates
+        # may have been lodged since, in which case the local ones are only used if the API fails
+        local_details, loaded_at = self._search_local_certificates(building_name_or_number, postcode)
+        stale_before = timezone.now() - datetime.timedelta(seconds=settings.EPC_LOCAL_CERTIFICATES_TTL)
+        if local_details and loaded_at >= stale_before:
+            return local_details
+
         epc_api = EPCApi()
-        data = epc_api.search_epc_details(building_name_or_number, postcode)
+        try:
+            data = epc_api.search_epc_details(building_name_or_number, postcode)
+        except RequestException as e:
+            if not local_details:
+                raise
+            logger.exception(f"Unable to search the Open EPC API, using the certificates loaded locally: {e}")
+            return local_details
         if data is None:
-            return []
+            return local_details
         address_and_epc_details = data["rows"]
         return address_and_epc_details
 
-    def get_epc(self, lmk):
-        epc_api = EPCApi()
-        epc_details_response = self._get_epc_details(epc_api, lmk)
-        epc_recommendations = self._get_epc_recommendations(epc_api, lmk)
-        return (
-            epc_details_response,
-            epc_recommendations,
+    def _search_local_certificates(self, building_name_or_number, postcode):
+        """
+        Returns
+        -------
+        Tuple[list, datetime.datetime]
+            The certificates found, with the same fields as the Open EPC API's search results for the ones used from
+            them, and when the most recently loaded of them was loaded
+        """
+        certificates = portal.models.EpcCertificate.objects.filter(
+            normalised_postcode=caches.normalise_postcode(postcode)
         )
+        building_name_or_number = building_name_or_number.strip()
+        if building_name_or_number:
+            certificates = certificates.filter(
+                Q(address1__icontains=building_name_or_number)
+                | Q(address2__icontains=building_name_or_number)
+                | Q(address3__icontains=building_name_or_number)
+            )
+        certificates = list(certificates.order_by("lmk_key"))
+        address_and_epc_details = [
+            {
+                "lmk-key": certificate.lmk_key,
+                # the API's address doesn't include the town
+                "address": ", ".join(filter(None, (certificate.address1, certificate.address2, certificate.address3))),
+                "address1": certificate.address1,
+                "address2": certificate.address2,
+                "address3": certificate.address3,
+                "posttown": certificate.posttown,
+                "postcode": certificate.postcode,
+                "uprn": certificate.uprn,
+                "lodgement-date": certificate.lodgement_date.isoformat(),
+            }
+            for certificate in certificates
+        ]
+        loaded_at = max((certificate.modified_at for certificate in certificates), default=None)
+        return address_and_epc_details, loaded_at
+
+    def get_epc_details(self, lmk):
+        """The certificate on its own, waiting at most EPC_LOOKUP_DEADLINE_SECONDS"""
+        epc_details_future = _get_epc_executor().submit(self._get_epc_details_on_executor, EPCApi(), lmk)
+        return epc_details_future.result(timeout=settings.EPC_LOOKUP_DEADLINE_SECONDS)
+
+    def _get_epc_details_on_executor(self, epc_api, lmk):
+        try:
+            return self._get_epc_details(epc_api, lmk)
+        finally:
+            # the executor's threads outlive the request, close the connections the lookup opened through the cache
+            connections.close_all()
+
+    def schedule_recommendations(self, session_id, lmk):
+        """
+        Fetches the certificate's recommendations once the current transaction has committed.
+
+        They're saved to the session's epc-select answer, and to its referral if that has been created but not yet
+        downloaded, provided the session still has this lmk selected. With EPC_RECOMMENDATIONS_FETCH_POLICY set to
+        "background" they're fetched on one of the worker's threads, otherwise straight away.
+
+        Background fetches are only queued in the worker's memory, so any still waiting when the worker restarts are
+        lost and the referral goes without recommendations.
+        """
+        if settings.EPC_RECOMMENDATIONS_FETCH_POLICY == "background":
+            fetch = functools.partial(_get_recommendations_executor().submit, self._fetch_recommendations_in_background)
+        else:
+            fetch = self._fetch_recommendations
+        # only once the answers already being saved are, so they can't overwrite the recommendations
+        transaction.on_commit(functools.partial(fetch, session_id, lmk))
+
+    def _fetch_recommendations_in_background(self, session_id, lmk):
+        try:
+            self._fetch_recommendations(session_id, lmk)
+        except Exception:  # noqa: B902
+            # nothing reads the future this runs in, so anything raised has to be logged here
+            logger.exception("Unable to save EPC recommendations")
+        finally:
+            # this runs on one of the executor's threads, which would otherwise keep their own connections open,
+            # including the cache connection the EPC API responses are cached through
+            connections.close_all()
+
+    def _fetch_recommendations(self, session_id, lmk):
+        delay = settings.EPC_RECOMMENDATIONS_RETRY_DELAY_SECONDS
+        for attempt in range(settings.EPC_RECOMMENDATIONS_ATTEMPTS):
+            try:
+                epc_recommendations = self._get_epc_recommendations(EPCApi(), lmk)
+                break
+            except RequestException as e:
+                if attempt == settings.EPC_RECOMMENDATIONS_ATTEMPTS - 1:
+                    logger.exception(f"Unable to fetch EPC recommendations, the referral won't include them: {e}")
+                    return
+                time.sleep(delay)
+                delay = delay * 2
+
+        with transaction.atomic():
+            # the user may have gone back and chosen another certificate or address since the fetch was scheduled
+            epc_select_answers = api.session.get_page_answers(session_id, epc_select_page)
+            session = api.session.get_session(session_id)
+            if epc_select_answers.get(lmk_field) != lmk or session.get(uprn_field) != epc_select_answers.get(
+                uprn_field
+            ):
+                return
+            # only the recommendations, so nothing the user has answered since is overwritten
+            api.session.save_answer(session_id, epc_select_page, {recommendations_field: epc_recommendations})
+
+            # the user may have already submitted, in which case fill in the referral they submitted
+            referral = (
+                portal.models.Referral.objects.select_for_update()
+                .filter(session_id=session_id, referral_download=None)
+                .first()
+            )
+            if referral is not None and referral.data.get(lmk_field) == lmk:
+                referral.data[recommendations_field] = epc_recommendations
+                referral.save()
 
     def _get_epc_details(self, epc_api, lmk):
         return epc_api.get_epc_details(lmk)["rows"][0]
@@ -671,6 +830,8 @@ class EPC(Entity):
             try:
                 return epc_api.get_epc_recommendations(lmk)["rows"]
             except RequestException as requestException:
+                if requestException.response is None:
+                    raise requestException
                 match requestException.response.status_code:
                     case 500:
                         # if on the last try
@@ -0,0 +1,71 @@
+import contextlib
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from help_to_heat.frontdoor import compaction
+
+
+class Command(BaseCommand):
+    help = "Remove superseded answers, abandoned sessions and old events"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--stale-days",
+            type=int,
+            default=2,
+            help="Days since the last answer after which an unreferred session's superseded answers are removed",
+        )
+        parser.add_argument(
+            "--retention-days",
+            type=int,
+            default=90,
+            help="Days since the last answer after which an unreferred session is deleted",
+        )
+        parser.add_argument(
+            "--event-retention-days",
+            type=int,
+            default=None,
+            help="Days after which events are deleted, events are kept if not given",
+        )
+        parser.add_argument("--batch-size", type=int, default=500, help="How many sessions or events per transaction")
+        parser.add_argument("--archive", type=str, default=None, help="A file to append deleted sessions and events to")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be removed without removing it")
+
+    def handle(self, *args, **kwargs):
+        now = timezone.now()
+        batch_size = kwargs["batch_size"]
+        dry_run = kwargs["dry_run"]
+        report = compaction.CompactionReport()
+
+        with contextlib.ExitStack() as stack:
+            archive_file = None
+            if kwargs["archive"] and not dry_run:
+                archive_file = stack.enter_context(open(kwargs["archive"], "a"))
+
+            compaction.delete_abandoned_sessions(
+                abandoned_before=now - timedelta(days=kwargs["retention_days"]),
+                batch_size=batch_size,
+                report=report,
+                archive_file=archive_file,
+                dry_run=dry_run,
+            )
+            compaction.compact_superseded_answers(
+                stale_before=now - timedelta(days=kwargs["stale_days"]),
+                batch_size=batch_size,
+                report=report,
+                dry_run=dry_run,
+            )
+            if kwargs["event_retention_days"] is not None:
+                compaction.prune_events(
+                    created_before=now - timedelta(days=kwargs["event_retention_days"]),
+                    batch_size=batch_size,
+                    report=report,
+                    archive_file=archive_file,
+                    dry_run=dry_run,
+                )
+
+        prefix = "Would remove" if dry_run else "Removed"
+        for line in report.lines():
+            print(f"{prefix} {line}")  # noqa: T201
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from help_to_heat.frontdoor import partitions
+
+
+class Command(BaseCommand):
+    help = "Create upcoming monthly partitions for Answer and Event, and detach old ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months-ahead", type=int, default=3, help="How many months of partitions to create")
+        parser.add_argument(
+            "--detach-older-than-months",
+            type=int,
+            default=None,
+            help="Detach partitions that ended at least this many months ago, nothing is detached if not given",
+        )
+
+    def handle(self, *args, **kwargs):
+        current_month = partitions.get_month_start(timezone.now())
+        for table in partitions.partitioned_tables:
+            if not partitions.is_partitioned(table):
+                raise CommandError(f"{table} isn't partitioned, partitioning is only available on postgres")
+
+        # containers starting together would otherwise race to create the same partitions
+        with partitions.lock_partitions():
+            for table in partitions.partitioned_tables:
+                for months in range(kwargs["months_ahead"] + 1):
+                    name = partitions.create_partition(table, partitions.add_months(current_month, months))
+                    if name:
+                        print(f"Created partition {name}")  # noqa: T201
+
+                if kwargs["detach_older_than_months"] is not None:
+                    before = partitions.add_months(current_month, -kwargs["detach_older_than_months"])
+                    for name in partitions.detach_partitions(table, before):
+                        print(f"Detached partition {name}, it can now be archived and dropped")  # noqa: T201
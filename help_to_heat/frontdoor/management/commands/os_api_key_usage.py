@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from help_to_heat.frontdoor.os_api import OSApi
+
+
+class Command(BaseCommand):
+    help = "Show how much each OS API key has been used today, and whether it's cooling down after hitting its limit"
+
+    def handle(self, *args, **kwargs):
+        for usage in OSApi(settings.OS_API_KEY).key_scheduler.get_usage():
+            cooling_down = ", cooling down" if usage["cooling_down"] else ""
+            print(f"Key at index {usage['index']}: {usage['uses_today']} requests today{cooling_down}")  # noqa: T201
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.8 on 2026-10-18 16:32
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("frontdoor", "0009_accesstoken"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SessionSnapshot",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("modified_at", models.DateTimeField(auto_now=True)),
+                ("session_id", models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ("data", models.JSONField(editable=False, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+            ],
+            options={
+                "ordering": ["created_at"],
+                "abstract": False,
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.8 on 2026-10-18 17:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("frontdoor", "0010_sessionsnapshot"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sessionsnapshot",
+            name="started_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,117 @@
+import datetime
+
+from django.db import migrations, transaction
+
+
+def partition_table(schema_editor, table, history_end):
+    # the existing table is kept as it is and attached as the partition holding everything before history_end
+    # this avoids copying all of history, and manage_partitions adds the monthly partitions from there on
+    history = f"{table}_history"
+    history_check = f"{table}_history_check"
+    with schema_editor.connection.cursor() as cursor:
+        # as the migration isn't atomic, a table partitioned before it stopped part way through is left as it is
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass)",
+            [table],
+        )
+        if cursor.fetchone()[0]:
+            return
+        # attaching the table scans all of it to check it fits the partition, under a lock that blocks reads and
+        # writes, unless a valid constraint already shows it does. The constraint is checked here, before the table
+        # is locked, where validating it only blocks other schema changes
+        cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {history_check}")
+        cursor.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT {history_check} "
+            "CHECK (created_at IS NOT NULL AND created_at < %s) NOT VALID",
+            [history_end],
+        )
+        cursor.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {history_check}")
+
+    with transaction.atomic(using=schema_editor.connection.alias), schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT quote_ident(nspname) FROM pg_class JOIN pg_namespace ON pg_namespace.oid = relnamespace "
+            "WHERE pg_class.oid = %s::regclass",
+            [table],
+        )
+        (schema,) = cursor.fetchone()
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {history}")
+
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'",
+            [history],
+        )
+        (primary_key_name,) = cursor.fetchone()
+        cursor.execute(f"ALTER TABLE {history} DROP CONSTRAINT {primary_key_name}")
+
+        cursor.execute(
+            "SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index JOIN pg_class i ON i.oid = pg_index.indexrelid "
+            "WHERE pg_index.indrelid = %s::regclass",
+            [history],
+        )
+        indexes = cursor.fetchall()
+
+        # identity columns can't be used on partitioned tables, so ids come from a plain sequence instead
+        cursor.execute(
+            "SELECT attidentity, pg_get_serial_sequence(%s, 'id') FROM pg_attribute "
+            "WHERE attrelid = %s::regclass AND attname = 'id'",
+            [history, history],
+        )
+        identity, sequence = cursor.fetchone()
+        has_sequence = bool(identity or sequence)
+        if identity:
+            cursor.execute(f"ALTER TABLE {history} ALTER COLUMN id DROP IDENTITY")
+        elif sequence:
+            cursor.execute(f"ALTER TABLE {history} ALTER COLUMN id DROP DEFAULT")
+
+        cursor.execute(
+            f"CREATE TABLE {table} (LIKE {history} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE) "
+            "PARTITION BY RANGE (created_at)"
+        )
+        # the check was copied from the existing table, the new table's rows aren't limited to history
+        cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {history_check}")
+        # the partition key has to be part of the primary key
+        cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, created_at)")
+
+        if has_sequence:
+            sequence_name = f"{table}_id_seq"
+            cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {sequence_name}")
+            cursor.execute(f"SELECT setval('{sequence_name}', COALESCE((SELECT MAX(id) FROM {history}), 0) + 1, false)")
+            cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{sequence_name}')")
+            cursor.execute(f"ALTER SEQUENCE {sequence_name} OWNED BY {table}.id")
+
+        # recreate the indexes under their original names, attaching the partition then reuses the existing ones
+        for index_name, index_definition in indexes:
+            history_on = f" ON {schema}.{history} "
+            if history_on not in index_definition:
+                raise ValueError(f"Unable to recreate index {index_name} from {index_definition}")
+            cursor.execute(f"ALTER INDEX {index_name} RENAME TO {index_name[:54]}_history")
+            cursor.execute(index_definition.replace(history_on, f" ON {schema}.{table} "))
+
+        cursor.execute(
+            f"ALTER TABLE {table} ATTACH PARTITION {history} FOR VALUES FROM (MINVALUE) TO (%s)", [history_end]
+        )
+        # the partition bound does the same job now
+        cursor.execute(f"ALTER TABLE {history} DROP CONSTRAINT {history_check}")
+        cursor.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+
+def partition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    today = datetime.datetime.now(tz=datetime.timezone.utc)
+    next_month = (today.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+    history_end = next_month.replace(hour=0, minute=0, second=0, microsecond=0)
+    for table in ("frontdoor_answer", "frontdoor_event"):
+        partition_table(schema_editor, table, history_end)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("frontdoor", "0011_sessionsnapshot_started_at"),
+    ]
+
+    # not run in one transaction, so the history constraint is validated before each table is locked
+    atomic = False
+
+    # the tables can't be turned back into plain ones without copying every row, so this can't be undone
+    operations = [migrations.RunPython(partition_tables)]
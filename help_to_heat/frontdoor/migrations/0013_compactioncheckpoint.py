@@ -0,0 +1,26 @@
+# Generated by Django 5.1.8 on 2026-10-18 19:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("frontdoor", "0012_partition_answer_and_event"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompactionCheckpoint",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("modified_at", models.DateTimeField(auto_now=True)),
+                ("name", models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ("checked_before", models.DateTimeField()),
+            ],
+            options={
+                "ordering": ["created_at"],
+                "abstract": False,
+            },
+        ),
+    ]
@@ -7,6 +7,7 @@ from help_to_heat import utils
 london_tz = tz.gettz("Europe/London")
 
 
+# Event and Answer are partitioned by month of created_at on postgres, see migration 0012 and manage_partitions
 class Event(utils.TimeStampedModel):
     name = models.CharField(max_length=256)
     data = models.JSONField(encoder=DjangoJSONEncoder)
@@ -25,6 +26,21 @@ class Answer(utils.UUIDPrimaryKeyBase, utils.TimeStampedModel):
         indexes = [models.Index(fields=["session_id"])]
 
 
+# the merged answers for a session, kept up to date as answers are saved
+# Answer remains the append-only record of everything the user submitted, this lets a whole session be read in one row
+class SessionSnapshot(utils.TimeStampedModel):
+    session_id = models.UUIDField(primary_key=True, editable=False)
+    data = models.JSONField(encoder=DjangoJSONEncoder, editable=False)
+    # when the session's first answer was saved, nothing for the session is older so reads can skip earlier partitions
+    started_at = models.DateTimeField(editable=False, blank=True, null=True)
+
+
+# how far compact_answers has got, so each run only looks at answers saved since the last one
+class CompactionCheckpoint(utils.TimeStampedModel):
+    name = models.CharField(max_length=64, primary_key=True)
+    checked_before = models.DateTimeField()
+
+
 class FeedbackDownload(utils.UUIDPrimaryKeyBase, utils.TimeStampedModel):
     file_name = models.CharField(max_length=255, blank=True, null=True)
 
@@ -1,10 +1,18 @@
 import ast
+import collections
+import datetime
+import hashlib
 import logging
+import threading
+import time
 from http import HTTPStatus
 
 import requests
+from django.conf import settings
+from django.core.cache import caches
 
-from help_to_heat.utils import default_api_timeout
+from . import http_client
+from .circuit_breakers import CircuitOpenException
 
 logger = logging.getLogger(__name__)
 
@@ -13,20 +21,138 @@ class ThrottledApiException(Exception):
     pass
 
 
+class _KeyUsage:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.state = {}
+        self.unsynced_uses = collections.Counter()
+        self.synced_at = None
+
+
+_key_usage = {}
+_key_usage_lock = threading.Lock()
+
+
+def reset_key_usage():
+    with _key_usage_lock:
+        _key_usage.clear()
+
+
+class KeyScheduler:
+    """
+    Chooses the order to try the OS API keys in, sharing what each worker has learnt about them through the cache.
+
+    Keys are tried least used first, so the load is spread across them. A key that has hit its usage limit is skipped
+    for OS_API_KEY_COOLDOWN_SECONDS. Usage is counted per key per day in the process, and synced with the cache every
+    OS_API_KEY_USAGE_SYNC_SECONDS rather than on every request, so what a worker knows of the other workers' usage
+    and cooldowns can be that far behind. The counts are approximate, uses not yet synced when a worker stops are lost.
+    """
+
+    def __init__(self, keys, cache_alias="shared"):
+        self.keys = keys
+        self.cache_alias = cache_alias
+        self.key_ids = tuple(hashlib.sha256(key.encode()).hexdigest()[:12] for key in keys)
+        with _key_usage_lock:
+            self.usage = _key_usage.setdefault(self.key_ids, _KeyUsage())
+
+    def _get_uses_key(self, index):
+        return f"os-api-key-uses:{datetime.date.today().isoformat()}:{self.key_ids[index]}"
+
+    def _get_cooldown_key(self, index):
+        return f"os-api-key-cooldown:{self.key_ids[index]}"
+
+    def get_keys_to_try(self):
+        """
+        Returns
+        -------
+        List[Tuple[int, str]]
+            The index and key of each key not cooling down, least used first
+        """
+        with self.usage.lock:
+            try:
+                if self.usage.synced_at is None or (
+                    time.monotonic() - self.usage.synced_at >= settings.OS_API_KEY_USAGE_SYNC_SECONDS
+                ):
+                    self._sync()
+            except Exception:  # noqa: B902
+                logger.exception("Unable to read the OS API key usage, trying the keys in order")
+                return list(enumerate(self.keys))
+            state = self.usage.state
+            uses = {
+                index: state.get(self._get_uses_key(index), 0) + self.usage.unsynced_uses[self._get_uses_key(index)]
+                for index in range(len(self.keys))
+            }
+
+        available_indexes = [index for index in range(len(self.keys)) if self._get_cooldown_key(index) not in state]
+        available_indexes.sort(key=lambda index: uses[index])
+        return [(index, self.keys[index]) for index in available_indexes]
+
+    def record_use(self, index):
+        with self.usage.lock:
+            self.usage.unsynced_uses[self._get_uses_key(index)] += 1
+
+    def record_throttled(self, index):
+        logger.error(f"The OS API usage limit has been hit for API key at index {index}, skipping it for a while.")
+        with self.usage.lock:
+            self.usage.state[self._get_cooldown_key(index)] = True
+        try:
+            caches[self.cache_alias].set(self._get_cooldown_key(index), True, settings.OS_API_KEY_COOLDOWN_SECONDS)
+        except Exception:  # noqa: B902
+            logger.exception("Unable to update the OS API key usage")
+
+    def _sync(self):
+        cache = caches[self.cache_alias]
+        for key, uses in list(self.usage.unsynced_uses.items()):
+            try:
+                cache.incr(key, uses)
+            except ValueError:
+                # kept for two days so yesterday's usage can still be seen early on in the day
+                if not cache.add(key, uses, 60 * 60 * 24 * 2):
+                    cache.incr(key, uses)
+            del self.usage.unsynced_uses[key]
+        self.usage.state = cache.get_many(
+            [self._get_uses_key(index) for index in range(len(self.keys))]
+            + [self._get_cooldown_key(index) for index in range(len(self.keys))]
+        )
+        self.usage.synced_at = time.monotonic()
+
+    def get_usage(self):
+        """Today's usage of each key, and whether it's cooling down"""
+        with self.usage.lock:
+            self._sync()
+            state = self.usage.state
+        return [
+            {
+                "index": index,
+                "uses_today": state.get(self._get_uses_key(index), 0),
+                "cooling_down": self._get_cooldown_key(index) in state,
+            }
+            for index in range(len(self.keys))
+        ]
+
+
 class OSApi:
     def __init__(self, keys):
         self.keys = ast.literal_eval(keys)
+        self.key_scheduler = KeyScheduler(self.keys)
 
     def get_by_postcode(self, postcode, offset, max_results):
-        for index, key in enumerate(self.keys):
-            url = f"""https://api.os.uk/search/places/v1/postcode?maxresults={max_results}
+        keys_to_try = self._get_keys_to_try()
+        for attempt, (index, key) in enumerate(keys_to_try):
+            url = f"""{http_client.os_api_base_url}search/places/v1/postcode?maxresults={max_results}
                 &postcode={postcode}&lr=EN&dataset=DPA,LPI&key={key}"""
             if offset:
                 url += f"&offset={offset}"
 
             try:
+                self.key_scheduler.record_use(index)
                 return self.perform_request(url)
 
+            except CircuitOpenException:
+                # the same as any other failure, no addresses are found and the user can enter theirs manually
+                logger.warning(f"Not fetching addresses for postcode {postcode}, the OS API has been failing")
+                break
+
             except requests.exceptions.HTTPError or requests.exceptions.RequestException as e:
                 # we log the postcode here in case of error to help diagnose if there are patterns in the kinds of
                 # postcodes that cause a ratelimit hit
@@ -35,10 +161,9 @@ class OSApi:
                 # the logs themselves are retained for a week in CloudWatch
                 status_code = e.response.status_code
                 if status_code == HTTPStatus.TOO_MANY_REQUESTS:
-                    logger.error(
-                        f"The OS API usage limit has been hit for API key at index {index} for postcode {postcode}."
-                    )
-                    if index == len(self.keys) - 1:
+                    logger.error(f"The OS API usage limit was hit for postcode {postcode}.")
+                    self.key_scheduler.record_throttled(index)
+                    if attempt == len(keys_to_try) - 1:
                         logger.error(f"The OS API usage limit has been hit for all API keys for postcode {postcode}.")
                         raise ThrottledApiException
                     else:
@@ -48,8 +173,31 @@ class OSApi:
                 break
         return []
 
+    def get_by_uprn(self, uprn, dataset):
+        keys_to_try = self._get_keys_to_try()
+        for attempt, (index, key) in enumerate(keys_to_try):
+            url = f"{http_client.os_api_base_url}search/places/v1/uprn?uprn={uprn}&dataset={dataset}&key={key}"
+            try:
+                self.key_scheduler.record_use(index)
+                return self.perform_request(url)
+            except requests.exceptions.HTTPError as e:
+                if e.response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+                    self.key_scheduler.record_throttled(index)
+                    if attempt == len(keys_to_try) - 1:
+                        logger.error("The OS API usage limit has been hit for all API keys")
+                        raise ThrottledApiException
+                    continue
+                raise
+
+    def _get_keys_to_try(self):
+        keys_to_try = self.key_scheduler.get_keys_to_try()
+        if not keys_to_try:
+            logger.error("All the OS API keys have recently hit their usage limit")
+            raise ThrottledApiException
+        return keys_to_try
+
     def perform_request(self, url):
-        response = requests.get(url, timeout=default_api_timeout)
+        response = http_client.get("os", url)
         response.raise_for_status()
         json_response = response.json()
 
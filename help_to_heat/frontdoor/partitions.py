@@ -0,0 +1,151 @@
+import contextlib
+import datetime
+import re
+
+from django.db import connection, transaction
+
+# the tables partitioned by month of created_at, see migration 0012_partition_answer_and_event
+partitioned_tables = ("frontdoor_answer", "frontdoor_event")
+
+_bound_pattern = re.compile(r"FOR VALUES FROM \((?P<start>[^)]+)\) TO \((?P<end>[^)]+)\)")
+
+
+# held while partitions are managed, each web container runs manage_partitions as it starts
+_lock_name = "manage_partitions"
+
+
+def get_month_start(date):
+    return datetime.datetime(date.year, date.month, 1, tzinfo=datetime.timezone.utc)
+
+
+def add_months(month_start, months):
+    month_index = month_start.year * 12 + month_start.month - 1 + months
+    return month_start.replace(year=month_index // 12, month=month_index % 12 + 1)
+
+
+@contextlib.contextmanager
+def lock_partitions():
+    """Wait for any other process managing partitions to finish, so two don't create or attach the same one"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(hashtext(%s))", [_lock_name])
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", [_lock_name])
+
+
+def get_partition_name(table, month_start):
+    return f"{table}_p{month_start:%Y_%m}"
+
+
+def get_default_partition_name(table):
+    return f"{table}_default"
+
+
+def is_partitioned(table):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s)",
+            [table],
+        )
+        return cursor.fetchone()[0]
+
+
+def _parse_bound(value):
+    if value == "MINVALUE":
+        return None
+    return datetime.datetime.fromisoformat(value.strip("'"))
+
+
+def get_partitions(table):
+    """
+    List the range partitions currently attached to a table.
+
+    Returns
+    -------
+    A list of (partition name, start, end) ordered by start, with a start of None for the partition holding all
+    earlier history. The default partition isn't included.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = %s",
+            [table],
+        )
+        rows = cursor.fetchall()
+
+    partitions = []
+    for name, bound in rows:
+        match = _bound_pattern.match(bound)
+        if match:
+            partitions.append((name, _parse_bound(match["start"]), _parse_bound(match["end"])))
+    earliest = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+    return sorted(partitions, key=lambda partition: partition[1] or earliest)
+
+
+def create_partition(table, month_start):
+    """
+    Create the partition for the month starting at month_start, unless it's already covered.
+
+    Rows for that month that were written to the default partition are moved into the new partition.
+
+    Returns
+    -------
+    The name of the new partition, or None if nothing was created
+    """
+    month_end = add_months(month_start, 1)
+    for _, start, end in get_partitions(table):
+        if (start is None or start < month_end) and month_start < end:
+            return None
+
+    name = get_partition_name(table, month_start)
+    default_name = get_default_partition_name(table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [name])
+        if cursor.fetchone()[0]:
+            # a partition that has been detached, it's waiting to be archived so leave it be
+            return None
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {default_name} WHERE created_at >= %s AND created_at < %s)",
+            [month_start, month_end],
+        )
+        has_default_rows = cursor.fetchone()[0]
+        if has_default_rows:
+            # the default partition can't be left holding rows that belong to the new partition
+            cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {default_name}")
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)", [month_start, month_end]
+        )
+        if has_default_rows:
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {default_name} WHERE created_at >= %s AND created_at < %s RETURNING *) "
+                f"INSERT INTO {table} SELECT * FROM moved",
+                [month_start, month_end],
+            )
+            cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {default_name} DEFAULT")
+    return name
+
+
+def detach_partitions(table, before):
+    """
+    Detach every partition holding only rows created before the given date.
+
+    The detached tables are left in place to be archived (e.g. with pg_dump) and dropped.
+
+    Returns
+    -------
+    The names of the detached partitions
+    """
+    detached = []
+    for name, _, end in get_partitions(table):
+        if end <= before:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+            detached.append(name)
+    return detached
@@ -1,4 +1,6 @@
-from collections import deque
+import threading
+from collections import OrderedDict, deque
+from collections.abc import Mapping
 
 from help_to_heat.frontdoor.consts import govuk_start_page, unknown_page
 from help_to_heat.frontdoor.routing.forwards_routing import get_next_page
@@ -7,6 +9,11 @@ from help_to_heat.frontdoor.routing.forwards_routing import get_next_page
 # currently the longest journey is under 30 pages
 max_journey_length = 100
 
+# journeys depend on a handful of answers with a few possible values each, so this comfortably holds every shape seen
+max_cached_journeys = 4096
+
+_missing = object()
+
 
 def calculate_journey(answers, to_page, from_page=None):
     """
@@ -31,6 +38,10 @@ def calculate_journey(answers, to_page, from_page=None):
     if from_page is None:
         from_page = govuk_start_page
 
+    return _journey_cache.get_journey(answers, from_page, to_page)
+
+
+def _calculate_journey(answers, to_page, from_page):
     journey = deque([from_page])
 
     while len(journey) < max_journey_length:
@@ -53,3 +64,104 @@ class CouldNotCalculateJourneyException(Exception):
     def __init__(self, from_page, to_page, partial_journey):
         super().__init__(f"Could not calculate a journey from {from_page} to {to_page}. Route tried: {partial_journey}")
         self.partial_journey = partial_journey
+
+
+class _RecordingAnswers(Mapping):
+    """Answers that remember which fields were looked at, which are the only ones that decided the journey"""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.fields_read = set()
+
+    def __getitem__(self, key):
+        self.fields_read.add(key)
+        return self.answers[key]
+
+    def __contains__(self, key):
+        self.fields_read.add(key)
+        return key in self.answers
+
+    def __iter__(self):
+        raise TypeError("routing can only depend on named answers")
+
+    def __len__(self):
+        raise TypeError("routing can only depend on named answers")
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class JourneyCache:
+    """
+    Journeys already calculated, keyed by the pages they run between and the answers that routing read.
+
+    Every field routing has ever read is part of the key, so two sessions that agree on all of them share a journey
+    however much else they differ on.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.journeys = OrderedDict()
+        self.routing_fields = ()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_key(self, answers, from_page, to_page, routing_fields):
+        return (
+            from_page,
+            to_page,
+            routing_fields,
+            tuple(_freeze(answers.get(field, _missing)) for field in routing_fields),
+        )
+
+    def get_journey(self, answers, from_page, to_page):
+        routing_fields = self.routing_fields
+        key = self._get_key(answers, from_page, to_page, routing_fields)
+        with self.lock:
+            journey = self.journeys.get(key)
+            if journey is not None:
+                self.journeys.move_to_end(key)
+                self.hits += 1
+                return list(journey)
+            self.misses += 1
+
+        recording_answers = _RecordingAnswers(answers)
+        journey = _calculate_journey(recording_answers, to_page, from_page)
+
+        with self.lock:
+            # fields seen for the first time make the key longer, earlier entries then stop matching and age out
+            routing_fields = tuple(sorted(set(self.routing_fields) | recording_answers.fields_read))
+            self.routing_fields = routing_fields
+            key = self._get_key(answers, from_page, to_page, routing_fields)
+            self.journeys[key] = tuple(journey)
+            if len(self.journeys) > self.max_size:
+                self.journeys.popitem(last=False)
+        return journey
+
+    def info(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.journeys)}
+
+    def clear(self):
+        with self.lock:
+            self.journeys.clear()
+            self.routing_fields = ()
+            self.hits = 0
+            self.misses = 0
+
+
+_journey_cache = JourneyCache(max_cached_journeys)
+
+
+def journey_cache_info():
+    return _journey_cache.info()
+
+
+def clear_journey_cache():
+    _journey_cache.clear()
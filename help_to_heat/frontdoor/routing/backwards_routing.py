@@ -4,6 +4,7 @@ from help_to_heat.frontdoor.consts import (
     unknown_page,
 )
 from help_to_heat.frontdoor.routing import calculate_journey
+from help_to_heat.frontdoor.routing.routing_graph import routing_graph
 
 start_page = country_page
 # in case of infinite loop ensure a journey can't go on forever
@@ -31,6 +32,11 @@ def get_prev_page(current_page, answers):
     if current_page == govuk_start_page:
         return unknown_page
 
+    # most pages can only be reached one way, so there's no need to work out the journey
+    only_predecessor = routing_graph.get_only_predecessor(current_page)
+    if only_predecessor is not None:
+        return only_predecessor
+
     journey = calculate_journey(answers, current_page)
 
     # if the page has been found, the last item in the list (index -1) will be the current page
@@ -115,6 +115,7 @@ def _requires_answer(answer_key):
 
             return func(answers)
 
+        next_page_function.required_answer = answer_key
         return next_page_function
 
     return wrapper
@@ -136,106 +137,15 @@ def get_next_page(current_page, answers):
         New page ID, or `unknown_page` (variable in consts.py) if the user hasn't given the required
         information on this page to determine the next page.
     """
-    if current_page == govuk_start_page:
-        return _govuk_start_page_next_page()
-
-    if current_page == country_page:
-        return _country_next_page(answers)
-
-    if current_page == supplier_page:
-        return _supplier_next_page(answers)
-
-    if current_page == alternative_supplier_page:
-        return _alternative_supplier_next_page(answers)
-
-    if current_page == bulb_warning_page:
-        return _bulb_warning_page_next_page(answers)
-
-    if current_page == shell_warning_page:
-        return _shell_warning_page_next_page(answers)
-
-    if current_page == utility_warehouse_warning_page:
-        return _utility_warehouse_warning_page_next_page(answers)
-
-    if current_page == own_property_page:
-        return _own_property_next_page(answers)
-
-    if current_page == property_type_page:
-        return _property_type_next_page(answers)
-
-    if current_page == property_subtype_page:
-        return _property_subtype_next_page(answers)
-
-    if current_page == address_page:
-        return _address_next_page(answers)
-
-    if current_page == epc_select_page:
-        return _epc_select_next_page(answers)
-
-    if current_page == address_select_page:
-        return _address_select_next_page(answers)
-
-    if current_page == address_manual_page:
-        return _address_manual_next_page()
-
-    if current_page == epc_select_manual_page:
-        return _epc_select_manual_next_page()
-
-    if current_page == address_select_manual_page:
-        return _address_select_manual_next_page()
-
-    if current_page == referral_already_submitted_page:
-        return _referral_already_submitted_next_page(answers)
-
-    if current_page == council_tax_band_page:
-        return _council_tax_band_next_page(answers)
-
-    if current_page == epc_page:
-        return _epc_next_page(answers)
-
-    if current_page == no_epc_page:
-        return _no_epc_next_page(answers)
-
-    if current_page == benefits_page:
-        return _benefits_next_page(answers)
-
-    if current_page == household_income_page:
-        return _household_income_next_page(answers)
-
-    if current_page == number_of_bedrooms_page:
-        return _number_of_bedrooms_next_page(answers)
-
-    if current_page == wall_type_page:
-        return _wall_type_next_page(answers)
-
-    if current_page == wall_insulation_page:
-        return _wall_insulation_next_page(answers)
-
-    if current_page == loft_page:
-        return _loft_next_page(answers)
-
-    if current_page == loft_access_page:
-        return _loft_access_next_page(answers)
-
-    if current_page == loft_insulation_page:
-        return _loft_insulation_next_page(answers)
-
-    if current_page == summary_page:
-        return _summary_next_page()
-
-    if current_page == schemes_page:
-        return _schemes_next_page()
-
-    if current_page == contact_details_page:
-        return _contact_details_next_page()
-
-    if current_page == confirm_and_submit_page:
-        return _confirm_and_submit_next_page()
+    rule = next_page_rules.get(current_page)
+    if rule is None:
+        return _unknown_response
 
-    return _unknown_response
+    next_page_function, _ = rule
+    return next_page_function(answers)
 
 
-def _govuk_start_page_next_page():
+def _govuk_start_page_next_page(_answers):
     return country_page
 
 
@@ -379,15 +289,15 @@ def _address_select_next_page(answers):
     return _unknown_response
 
 
-def _address_manual_next_page():
+def _address_manual_next_page(_answers):
     return _post_duplicate_uprn_next_page()
 
 
-def _epc_select_manual_next_page():
+def _epc_select_manual_next_page(_answers):
     return _post_duplicate_uprn_next_page()
 
 
-def _address_select_manual_next_page():
+def _address_select_manual_next_page(_answers):
     return _post_duplicate_uprn_next_page()
 
 
@@ -522,17 +432,73 @@ def _loft_insulation_next_page(_answers):
     return summary_page
 
 
-def _summary_next_page():
+def _summary_next_page(_answers):
     return schemes_page
 
 
-def _schemes_next_page():
+def _schemes_next_page(_answers):
     return contact_details_page
 
 
-def _contact_details_next_page():
+def _contact_details_next_page(_answers):
     return confirm_and_submit_page
 
 
-def _confirm_and_submit_next_page():
+def _confirm_and_submit_next_page(_answers):
     return success_page
+
+
+# the rule for each page, and every page that rule can lead to
+# any rule can also lead to unknown_page, if the answers it needs haven't been given
+next_page_rules = {
+    govuk_start_page: (_govuk_start_page_next_page, (country_page,)),
+    country_page: (_country_next_page, (supplier_page, northern_ireland_ineligible_page)),
+    supplier_page: (
+        _supplier_next_page,
+        (
+            alternative_supplier_page,
+            own_property_page,
+            bulb_warning_page,
+            shell_warning_page,
+            utility_warehouse_warning_page,
+        ),
+    ),
+    alternative_supplier_page: (
+        _alternative_supplier_next_page,
+        (own_property_page, bulb_warning_page, shell_warning_page, utility_warehouse_warning_page),
+    ),
+    bulb_warning_page: (_bulb_warning_page_next_page, (own_property_page,)),
+    shell_warning_page: (_shell_warning_page_next_page, (own_property_page,)),
+    utility_warehouse_warning_page: (_utility_warehouse_warning_page_next_page, (own_property_page,)),
+    own_property_page: (_own_property_next_page, (property_type_page, cannot_continue_page)),
+    property_type_page: (_property_type_next_page, (property_subtype_page, cannot_continue_page)),
+    property_subtype_page: (_property_subtype_next_page, (address_page,)),
+    address_page: (_address_next_page, (address_manual_page, epc_select_page, address_select_page)),
+    epc_select_page: (
+        _epc_select_next_page,
+        (referral_already_submitted_page, council_tax_band_page, address_select_page, epc_select_manual_page),
+    ),
+    address_select_page: (
+        _address_select_next_page,
+        (referral_already_submitted_page, council_tax_band_page, address_select_manual_page),
+    ),
+    address_manual_page: (_address_manual_next_page, (council_tax_band_page,)),
+    epc_select_manual_page: (_epc_select_manual_next_page, (council_tax_band_page,)),
+    address_select_manual_page: (_address_select_manual_next_page, (council_tax_band_page,)),
+    referral_already_submitted_page: (_referral_already_submitted_next_page, (council_tax_band_page,)),
+    council_tax_band_page: (_council_tax_band_next_page, (epc_page, no_epc_page, benefits_page)),
+    epc_page: (_epc_next_page, (epc_ineligible_page, benefits_page)),
+    no_epc_page: (_no_epc_next_page, (benefits_page,)),
+    benefits_page: (_benefits_next_page, (number_of_bedrooms_page, household_income_page)),
+    household_income_page: (_household_income_next_page, (property_ineligible_page, number_of_bedrooms_page)),
+    number_of_bedrooms_page: (_number_of_bedrooms_next_page, (wall_type_page,)),
+    wall_type_page: (_wall_type_next_page, (wall_insulation_page,)),
+    wall_insulation_page: (_wall_insulation_next_page, (loft_page,)),
+    loft_page: (_loft_next_page, (loft_access_page, summary_page)),
+    loft_access_page: (_loft_access_next_page, (loft_insulation_page,)),
+    loft_insulation_page: (_loft_insulation_next_page, (summary_page,)),
+    summary_page: (_summary_next_page, (schemes_page,)),
+    schemes_page: (_schemes_next_page, (contact_details_page,)),
+    contact_details_page: (_contact_details_next_page, (confirm_and_submit_page,)),
+    confirm_and_submit_page: (_confirm_and_submit_next_page, (success_page,)),
+}
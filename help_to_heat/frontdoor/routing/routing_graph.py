@@ -0,0 +1,97 @@
+from help_to_heat.frontdoor.consts import govuk_start_page
+from help_to_heat.frontdoor.routing.forwards_routing import next_page_rules
+
+
+class RoutingGraph:
+    """
+    The pages of the flow and the pages each can lead to, built from the forwards routing rules.
+
+    Each edge is guarded by the rule of the page it leaves, and required_answers holds the answer that rule needs
+    before it will lead anywhere.
+    """
+
+    def __init__(self, rules):
+        self.successors = {page: tuple(next_pages) for page, (_, next_pages) in rules.items()}
+        self.required_answers = {
+            page: getattr(next_page_function, "required_answer", None)
+            for page, (next_page_function, _) in rules.items()
+        }
+
+        predecessors = {}
+        for page, next_pages in self.successors.items():
+            for next_page in next_pages:
+                predecessors.setdefault(next_page, []).append(page)
+        self.predecessors = {page: tuple(previous_pages) for page, previous_pages in predecessors.items()}
+
+    def get_only_predecessor(self, page):
+        """
+        Returns
+        -------
+        str
+            The page before this one if only one page leads here, otherwise None
+        """
+        predecessors = self.predecessors.get(page, ())
+        if len(predecessors) == 1:
+            return predecessors[0]
+        return None
+
+    def find_cycle(self):
+        """
+        Returns
+        -------
+        List[str]
+            The pages of a loop in the flow, or None if there are no loops
+        """
+        visiting, visited = [], set()
+
+        def _visit(page):
+            if page in visiting:
+                return visiting[visiting.index(page) :] + [page]
+            if page in visited:
+                return None
+            visiting.append(page)
+            for next_page in self.successors.get(page, ()):
+                cycle = _visit(next_page)
+                if cycle:
+                    return cycle
+            visiting.pop()
+            visited.add(page)
+            return None
+
+        for page in self.successors:
+            cycle = _visit(page)
+            if cycle:
+                return cycle
+        return None
+
+    def get_longest_journey_length(self, from_page=govuk_start_page):
+        """
+        The number of pages in the longest journey from from_page, the graph must not have any loops.
+        """
+        lengths = {}
+
+        def _length(page):
+            if page not in lengths:
+                lengths[page] = 1 + max((_length(next_page) for next_page in self.successors.get(page, ())), default=0)
+            return lengths[page]
+
+        return _length(from_page)
+
+
+routing_graph = RoutingGraph(next_page_rules)
+
+
+class InvalidRoutingGraphException(Exception):
+    pass
+
+
+def verify_routing_graph(graph, max_journey_length):
+    cycle = graph.find_cycle()
+    if cycle:
+        raise InvalidRoutingGraphException(f"The flow loops through {cycle}")
+
+    longest_journey_length = graph.get_longest_journey_length()
+    if longest_journey_length >= max_journey_length:
+        raise InvalidRoutingGraphException(
+            f"The longest journey has {longest_journey_length} pages, journeys are limited to {max_journey_length}"
+        )
@@ -0,0 +1,76 @@
+import copy
+import functools
+import threading
+
+_local = threading.local()
+
+
+class SessionCache:
+    """
+    Answers read during a single request, keyed by session id.
+
+    Saving an answer drops everything held for that session, so a read after a write always goes back to the database.
+    """
+
+    def __init__(self):
+        self.sessions = {}
+
+    def get(self, session_id, key):
+        return self.sessions.get(session_id, {}).get(key)
+
+    def set(self, session_id, key, value):
+        self.sessions.setdefault(session_id, {})[key] = value
+
+    def invalidate(self, session_id):
+        self.sessions.pop(session_id, None)
+
+
+def start_request_cache():
+    _local.cache = SessionCache()
+
+
+def end_request_cache():
+    _local.cache = None
+
+
+def get_request_cache():
+    return getattr(_local, "cache", None)
+
+
+def cached_session_read(func):
+    """
+    Serve repeat calls for the same arguments from the request cache.
+
+    Outside of a request (for instance in management commands or background work) there is no cache, so every call
+    goes to the database.
+    """
+
+    @functools.wraps(func)
+    def _inner(self, session_id, **kwargs):
+        cache = get_request_cache()
+        if cache is None:
+            return func(self, session_id, **kwargs)
+
+        key = (func.__name__, *sorted(kwargs.items()))
+        result = cache.get(session_id, key)
+        if result is None:
+            result = func(self, session_id, **kwargs)
+            cache.set(session_id, key, result)
+
+        # callers are free to modify what they are given, so never hand out the cached object itself
+        return copy.deepcopy(result)
+
+    return _inner
+
+
+def invalidates_session_cache(func):
+    @functools.wraps(func)
+    def _inner(self, session_id, **kwargs):
+        try:
+            return func(self, session_id, **kwargs)
+        finally:
+            cache = get_request_cache()
+            if cache is not None:
+                cache.invalidate(session_id)
+
+    return _inner
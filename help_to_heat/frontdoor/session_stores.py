@@ -0,0 +1,165 @@
+import abc
+import datetime
+import functools
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.module_loading import import_string
+
+from . import models
+
+# older than any session, for sessions whose start isn't known
+_earliest = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+# answers can be saved by different servers, so allow for their clocks not quite agreeing
+_clock_skew_allowance = datetime.timedelta(hours=1)
+
+
+class SessionStore(abc.ABC):
+    """
+    Where the answers given in a session are kept.
+
+    Every method works with data that has already been through the interface schemas.
+    A page's answers are the fold of everything saved for it, with later answers winning.
+    """
+
+    @abc.abstractmethod
+    def save_answer(self, session_id, page_name, data):
+        pass
+
+    @abc.abstractmethod
+    def get_answer(self, session_id, page_name):
+        """The most recently saved answer for the page, or an empty dict"""
+
+    @abc.abstractmethod
+    def get_page_answers(self, session_id, page_name):
+        pass
+
+    @abc.abstractmethod
+    def get_session(self, session_id):
+        pass
+
+    @abc.abstractmethod
+    def get_answers_by_page(self, session_id):
+        """The same as get_page_answers for every page answered in the session"""
+
+
+# every answer is a row in Answer, reads fold the rows they need
+class AnswerLogSessionStore(SessionStore):
+    def save_answer(self, session_id, page_name, data):
+        answer = models.Answer.objects.create(
+            session_id=session_id,
+            page_name=page_name,
+            data=data,
+        )
+        return answer.data
+
+    def get_answer(self, session_id, page_name):
+        try:
+            answer = self._get_answers(session_id).filter(page_name=page_name).latest("created_at")
+            return answer.data
+        except models.Answer.DoesNotExist:
+            return {}
+
+    def get_page_answers(self, session_id, page_name):
+        page_answers = self._get_answers(session_id).filter(page_name=page_name).order_by("created_at").all()
+        answers = {k: v for a in page_answers for (k, v) in a.data.items()}
+        return answers
+
+    def get_session(self, session_id):
+        answers = self._get_answers(session_id).order_by("created_at").all()
+        session = {k: v for a in answers for (k, v) in a.data.items()}
+        return session
+
+    def get_answers_by_page(self, session_id):
+        # the same as calling get_page_answers for every page, but with a single query
+        answers = self._get_answers(session_id).order_by("created_at").all()
+        answers_by_page = {}
+        for answer in answers:
+            answers_by_page.setdefault(answer.page_name, {}).update(answer.data)
+        return answers_by_page
+
+    def _get_answers(self, session_id):
+        return models.Answer.objects.filter(session_id=session_id)
+
+
+# the answer log, plus a SessionSnapshot row per session so get_session is a single row read
+class SnapshotSessionStore(AnswerLogSessionStore):
+    def save_answer(self, session_id, page_name, data):
+        with transaction.atomic():
+            saved_data = super().save_answer(session_id, page_name, data)
+            self._update_snapshot(session_id, saved_data)
+        return saved_data
+
+    def get_session(self, session_id):
+        try:
+            return models.SessionSnapshot.objects.get(session_id=session_id).data
+        except models.SessionSnapshot.DoesNotExist:
+            # sessions started before snapshots were introduced only have their answers
+            # the snapshot will be created the next time an answer is saved
+            return super().get_session(session_id)
+
+    def _get_answers(self, session_id):
+        # on postgres Answer is partitioned by created_at, bounding it by the start of the session means partitions
+        # from before the session began aren't searched
+        started_at = models.SessionSnapshot.objects.filter(session_id=session_id).order_by().values("started_at")
+        started_at = Coalesce(Subquery(started_at), Value(_earliest)) - _clock_skew_allowance
+        return models.Answer.objects.filter(session_id=session_id, created_at__gte=started_at)
+
+    def _update_snapshot(self, session_id, data):
+        # lock the row so concurrent saves for the same session are applied one after another
+        snapshot, created = models.SessionSnapshot.objects.select_for_update().get_or_create(
+            session_id=session_id, defaults={"data": {}}
+        )
+        if created:
+            # the answer being saved is already in the log, so this includes it
+            snapshot.data = super().get_session(session_id)
+            snapshot.started_at = models.Answer.objects.filter(session_id=session_id).aggregate(
+                started_at=Min("created_at")
+            )["started_at"]
+        else:
+            snapshot.data = {**snapshot.data, **data}
+        snapshot.save()
+
+
+# answers only live in this process and are lost on restart, for load testing the rest of the stack without a database
+class LocalSessionStore(SessionStore):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.answers = {}
+
+    def save_answer(self, session_id, page_name, data):
+        with self.lock:
+            self.answers.setdefault(session_id, []).append((page_name, dict(data)))
+        return data
+
+    def _get_answers(self, session_id):
+        with self.lock:
+            return list(self.answers.get(session_id, ()))
+
+    def get_answer(self, session_id, page_name):
+        page_answers = [data for (name, data) in self._get_answers(session_id) if name == page_name]
+        return dict(page_answers[-1]) if page_answers else {}
+
+    def get_page_answers(self, session_id, page_name):
+        return self.get_answers_by_page(session_id).get(page_name, {})
+
+    def get_session(self, session_id):
+        return {k: v for (_, data) in self._get_answers(session_id) for (k, v) in data.items()}
+
+    def get_answers_by_page(self, session_id):
+        answers_by_page = {}
+        for page_name, data in self._get_answers(session_id):
+            answers_by_page.setdefault(page_name, {}).update(data)
+        return answers_by_page
+
+
+@functools.cache
+def _load_session_store(path):
+    return import_string(path)()
+
+
+def get_session_store():
+    return _load_session_store(settings.SESSION_STORE)
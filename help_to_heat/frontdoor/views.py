@@ -382,7 +382,7 @@ class PageView(utils.MethodDispatcher):
         if not errors:
             errors = {}
         answers = interface.api.session.get_session(session_id)
-        data = interface.api.session.get_answer(session_id, page_name)
+        data = self.get_saved_answer(session_id, page_name)
 
         # if there were validation errors some user inputted data won't have been stored as an answer
         # they will be passed as unsaved_data so that they don't disappear from the page
@@ -487,6 +487,10 @@ class PageView(utils.MethodDispatcher):
                 return redirect("/sorry")
             return redirect("frontdoor:page", session_id=session_id, page_name=next_page_name)
 
+    def get_saved_answer(self, session_id, page_name):
+        """The answer the page is filled in with when it's shown again"""
+        return interface.api.session.get_answer(session_id, page_name)
+
     def build_extra_context(self, request, session_id, page_name, data, is_change_page, errors):
         """
         Build any additional data to be added to the context.
@@ -679,6 +683,10 @@ class AddressView(PageView):
 
 @register_page(epc_select_page)
 class EpcSelectView(PageView):
+    def get_saved_answer(self, session_id, page_name):
+        # the recommendations are saved as an answer of their own once they've been fetched
+        return interface.api.session.get_page_answers(session_id, page_name)
+
     def format_address(self, address):
         address_parts = [
             address["address1"],
@@ -721,7 +729,7 @@ class EpcSelectView(PageView):
             return data
 
         try:
-            epc_details, recommendations = interface.api.epc.get_epc(lmk)
+            epc_details = interface.api.epc.get_epc_details(lmk)
         except Exception as e:  # noqa: B902
             logger.exception(f"An error occurred: {e}")
             reset_epc_details(session_id)
@@ -737,9 +745,11 @@ class EpcSelectView(PageView):
             lmk_field: lmk,
             address_field: address,
             epc_details_field: epc_details,
-            recommendations_field: recommendations,
+            # filled in once they've been fetched, they're only needed for the referral
+            recommendations_field: [],
             uprn_field: uprn if uprn is not None else "",
         }
+        interface.api.epc.schedule_recommendations(session_id, lmk)
 
         data = {**data, **epc_data}
 
@@ -790,6 +800,16 @@ class AddressSelectView(PageView):
         postcode = session_data.get(address_postcode_field)
         return interface.api.address.find_addresses(building_name_or_number, postcode)
 
+    def _get_selected_address(self, session_data, uprn):
+        # the addresses stored on the address page include each full address, so it only needs looking up for
+        # sessions from before they did
+        for address in session_data.get(address_all_address_and_details_field, []):
+            if address.get("uprn") == uprn and address.get("address"):
+                return address["address"]
+
+        address_data = interface.api.address.get_address(uprn, session_data.get(address_postcode_field))
+        return address_data["address"]
+
     def save_post_data(self, data, session_id, page_name):
         uprn = data.get(uprn_field)
 
@@ -799,15 +819,14 @@ class AddressSelectView(PageView):
 
         data[address_select_choice_journey_field] = address_select_choice_journey_field_select_address
 
-        address_data = interface.api.address.get_address(uprn)
-        data[address_field] = address_data["address"]
+        answers = interface.api.session.get_session(session_id)
+        data[address_field] = self._get_selected_address(answers, uprn)
 
         duplicate_referral_checker = DuplicateReferralChecker(session_id)
         data[duplicate_uprn_journey_field] = (
             field_yes if duplicate_referral_checker.is_referral_a_recent_duplicate() else field_no
         )
 
-        answers = interface.api.session.get_session(session_id)
         country = answers.get(country_field)
 
         data[epc_found_journey_field] = field_no
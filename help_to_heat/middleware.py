@@ -1,7 +1,11 @@
 import logging
 
+from django.conf import settings
 from django.core.handlers.wsgi import WSGIRequest
 
+from help_to_heat import utils
+from help_to_heat.frontdoor import session_cache
+
 logger = logging.getLogger(__name__)
 requests_logger = logging.getLogger("help_to_heat.requests")
 
@@ -27,3 +31,36 @@ class RequestLoggingMiddleware:
     def __call__(self, request: WSGIRequest):
         requests_logger.info(f"{request.method}: {request.path}")
         return self.get_response(request)
+
+
+class SessionCacheMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # answers read while handling this request are shared between the views and interface calls that need them
+        session_cache.start_request_cache()
+        try:
+            return self.get_response(request)
+        finally:
+            session_cache.end_request_cache()
+
+
+class EventBufferMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if settings.EVENT_FLUSH_POLICY != "request":
+            return self.get_response(request)
+
+        # events registered while handling this request are written together once the response has been produced
+        utils.start_event_buffer()
+        flush = False
+        try:
+            response = self.get_response(request)
+            # a failed request rolls back its answers, so its events shouldn't be kept either
+            flush = response.status_code < 500
+            return response
+        finally:
+            utils.end_event_buffer(flush=flush)
@@ -1,18 +1,32 @@
 import bz2
+import codecs
 import csv
 import datetime
+import heapq
+import io
+import itertools
 import pathlib
+import sys
+import tempfile
+import time
+import zipfile
 
 import httpx
 from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
 
+from help_to_heat.frontdoor.caches import normalise_postcode
 from help_to_heat.portal import models
 
 DATA_DIR = settings.BASE_DIR / "temp-data"
 CHUNK_SIZE = 16 * 1024
+SORT_MEMORY_BUDGET = 256 * 1024 * 1024
+# how often a run is saved while downloading and sorting, when it has no batches to record
+KEEP_ALIVE_SECONDS = 60
 
 
-def save_url_in_chunks(url):
+def save_url_in_chunks(url, sort_memory_budget=SORT_MEMORY_BUDGET, run=None):
     decompressor = bz2.BZ2Decompressor()
     filename = pathlib.Path(url).stem
     filepath = DATA_DIR / filename
@@ -22,7 +36,7 @@ def save_url_in_chunks(url):
             filepath.parent.mkdir(parents=True, exist_ok=True)
         with filepath.open("wb") as f:
             with httpx.stream("GET", url) as response:
-                for chunk in response.iter_bytes(CHUNK_SIZE):
+                for chunk in _keep_alive(response.iter_bytes(CHUNK_SIZE), run):
                     text = decompressor.decompress(chunk)
                     f.write(text)
     else:
@@ -31,43 +45,477 @@ def save_url_in_chunks(url):
     sorted_filepath = DATA_DIR / "".join((filepath.stem, "-sorted", filepath.suffix))
     if not sorted_filepath.exists():
         print(f"Sorting to: {sorted_filepath}")  # noqa: T201
-        with filepath.open("r") as f:
-            lines = f.readlines()
-        header = lines[0]
-        lines = lines[1:]
-        lines.sort()
-        with sorted_filepath.open("w") as f:
-            f.writelines([header])
-            f.writelines(lines)
+        sort_lines(filepath, sorted_filepath, sort_memory_budget, run)
     else:
         print(f"Skipping sort: {sorted_filepath} already exists")  # noqa: T201
     return sorted_filepath
 
 
-def read_rows(filepath):
+def sort_lines(filepath, sorted_filepath, memory_budget, run=None):
+    """
+    Write the lines of the file after its header in sorted order, holding about memory_budget bytes of them at once.
+
+    The lines are sorted in runs that fit the budget, each written to a temporary file, and the runs are then merged.
+    """
+    partial_filepath = sorted_filepath.with_name(sorted_filepath.name + ".partial")
+    with filepath.open("r") as f, tempfile.TemporaryDirectory(dir=DATA_DIR) as runs_dir:
+        header = f.readline()
+        run_filepaths = []
+        last_line = None
+        while lines := _read_run(_keep_alive(f, run), memory_budget):
+            if not lines[-1].endswith("\n"):
+                # only the last line of the file can be missing its newline, it's merged on its own so it isn't
+                # joined to the line after it in a run
+                last_line = lines.pop()
+            lines.sort()
+            run_filepath = pathlib.Path(runs_dir) / f"run-{len(run_filepaths)}"
+            with run_filepath.open("w") as run_file:
+                run_file.writelines(lines)
+            run_filepaths.append(run_filepath)
+            print(f"Sorted run {len(run_filepaths)} of {len(lines)} lines")  # noqa: T201
+
+        print(f"Merging {len(run_filepaths)} runs")  # noqa: T201
+        run_files = [run_filepath.open("r") for run_filepath in run_filepaths]
+        try:
+            with partial_filepath.open("w") as sorted_file:
+                sorted_file.write(header)
+                merged_lines = heapq.merge(*run_files, [last_line] if last_line is not None else [])
+                sorted_file.writelines(_keep_alive(merged_lines, run))
+        finally:
+            for run_file in run_files:
+                run_file.close()
+    # only appears once it's complete, so an interrupted sort isn't mistaken for a finished one
+    partial_filepath.replace(sorted_filepath)
+
+
+def _keep_alive(items, run):
+    # saves the run now and again, so a long download or sort isn't mistaken for a load that has stopped
+    saved_at = time.monotonic()
+    for item in items:
+        if run and time.monotonic() - saved_at >= KEEP_ALIVE_SECONDS:
+            run.save(update_fields=["modified_at"])
+            saved_at = time.monotonic()
+        yield item
+
+
+def _read_run(f, memory_budget):
+    lines = []
+    size = 0
+    for line in f:
+        lines.append(line)
+        size += sys.getsizeof(line)
+        if size >= memory_budget:
+            break
+    return lines
+
+
+def read_rows(filepath, run=None):
     with filepath.open() as f:
-        reader = csv.DictReader(f)
+        reader = csv.DictReader(_count_bytes(f, run))
         for row in reader:
             yield row
 
 
+def _count_bytes(lines, run):
+    for line in lines:
+        if run:
+            run.bytes_read += len(line.encode("utf-8"))
+        yield line
+
+
 def get_latest_date():
     if models.EpcRating.objects.exists():
         latest_date = str(models.EpcRating.objects.latest("date").date)
-        print(f"Resuming from {latest_date}")  # noqa: T201
+        print(f"Loading from {latest_date}")  # noqa: T201
     else:
         latest_date = str(datetime.date(1970, 1, 1))
         print("Starting from beginning")  # noqa: T201
     return latest_date
 
 
-def write_rows(rows):
+class LoadRunInProgressException(Exception):
+    pass
+
+
+def mark_stale_load_runs():
+    """Marks runs that haven't been saved for EPC_LOAD_RUN_STALE_SECONDS as failed, their process has gone"""
+    stale_before = timezone.now() - datetime.timedelta(seconds=settings.EPC_LOAD_RUN_STALE_SECONDS)
+    runs = models.EpcLoadRun.objects.filter(status__in=models.epc_load_run_in_progress_statuses)
+    return runs.filter(modified_at__lt=stale_before).update(
+        status="failed", error="Stopped without finishing", modified_at=timezone.now()
+    )
+
+
+def start_load_run(url, streamed=False, total_bytes=None, status="running"):
+    """
+    The unfinished load of the url to carry on from, or a new one if every load of it has finished.
+
+    A new load skips rows from before the latest date already loaded, a resumed one keeps the date it started with
+    and skips the rows it has already committed.
+
+    Raises
+    ------
+    LoadRunInProgressException
+        If another process is still loading the url
+    """
+    mark_stale_load_runs()
+    with transaction.atomic(), connection.cursor() as cursor:
+        # held until the run is saved, so two processes can't both start a new run for the url
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [url])
+        if models.EpcLoadRun.objects.filter(url=url, status__in=models.epc_load_run_in_progress_statuses).exists():
+            raise LoadRunInProgressException(f"{url} is already being loaded")
+
+        run = (
+            models.EpcLoadRun.objects.select_for_update()
+            .filter(url=url, streamed=streamed)
+            .exclude(status="completed")
+            .order_by("-started_at")
+            .first()
+        )
+        if run:
+            print(f"Resuming after row {run.rows_read}")  # noqa: T201
+            run.status = status
+            run.error = ""
+            # the source is read again from the start
+            run.bytes_read = 0
+            run.total_bytes = total_bytes
+            run.save()
+            return run
+        return models.EpcLoadRun.objects.create(
+            url=url, streamed=streamed, status=status, latest_date=get_latest_date(), total_bytes=total_bytes
+        )
+
+
+def write_rows(rows, run, batch_size=10000, keep_latest=False):
+    """
+    Upsert the EPC ratings in batches, skipping rows from before the run's latest date.
+
+    Each batch is copied into a temporary staging table and merged into portal_epcrating with a single upsert. The
+    run's progress is saved in the same transaction, so a load that stops part way through carries on from exactly
+    the row after the last batch committed.
+    """
     print("Loading to database")  # noqa: T201
-    latest_date = get_latest_date()
-    for row in rows:
-        if row["date"] >= latest_date:
-            models.EpcRating.objects.update_or_create(
-                uprn=row["uprn"],
-                defaults={"rating": row["epc_rating"], "date": row["date"]},
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMPORARY TABLE IF NOT EXISTS portal_epcrating_staging "
+            "(position integer, uprn varchar(12), rating varchar(32), date date)"
+        )
+
+    latest_date = str(run.latest_date)
+    rows = itertools.islice(rows, run.rows_read, None)
+    count = 0
+    start = time.monotonic()
+    try:
+        while batch := list(itertools.islice(rows, batch_size)):
+            ratings = [row for row in batch if row["date"] >= latest_date]
+            with transaction.atomic():
+                # the run is locked while the batch is written, and only carries on from where this process left it
+                rows_read = models.EpcLoadRun.objects.select_for_update().values_list("rows_read", flat=True)
+                if rows_read.get(id=run.id) != run.rows_read:
+                    raise LoadRunInProgressException(f"{run.url} has been loaded further by another process")
+                if ratings:
+                    _upsert_epc_ratings(ratings, keep_latest)
+                run.rows_read += len(batch)
+                run.rows_written += len(ratings)
+                run.batches_committed += 1
+                run.last_batch_at = timezone.now()
+                run.save()
+            count += len(batch)
+            rate = count / max(time.monotonic() - start, 1e-6)
+            print(f"Loaded {run.rows_read} rows ({rate:.0f} rows/s)")  # noqa: T201
+    except LoadRunInProgressException:
+        # the run belongs to the other process now, which carries on with it
+        raise
+    except Exception as e:  # noqa: B902
+        _fail_load_run(run, e)
+        raise
+
+    run.status = "completed"
+    run.finished_at = timezone.now()
+    run.save()
+    print("Finished loading")  # noqa: T201
+
+
+def _fail_load_run(run, e):
+    # only the status, the progress saved with the last batch committed is where the load carries on from
+    run.status = "failed"
+    run.error = str(e)
+    run.save(update_fields=["status", "error", "modified_at"])
+
+
+def load_url_to_database(url, sort_memory_budget=SORT_MEMORY_BUDGET, batch_size=10000):
+    """
+    Load the EPC ratings once they've been downloaded and sorted.
+
+    The run is started before downloading, so another load of the url can't start and write to the same download.
+    """
+    run = start_load_run(url, status="downloading")
+    try:
+        sorted_filepath = save_url_in_chunks(url, sort_memory_budget=sort_memory_budget, run=run)
+    except Exception as e:  # noqa: B902
+        _fail_load_run(run, e)
+        raise
+    run.status = "running"
+    run.total_bytes = sorted_filepath.stat().st_size
+    run.save()
+    write_rows(read_rows(sorted_filepath, run), run, batch_size=batch_size)
+
+
+def stream_url_to_database(url, batch_size=10000):
+    """
+    Load the EPC ratings straight from the download, decompressing and parsing it as it arrives, without writing it
+    to disk or sorting it.
+
+    As the rows aren't in order, the rating with the latest date is kept for each uprn.
+    """
+    run = start_load_run(url, streamed=True)
+    print(f"Streaming to database: {url}")  # noqa: T201
+    write_rows(stream_rows(url, run), run, batch_size=batch_size, keep_latest=True)
+
+
+def stream_rows(url, run=None):
+    return csv.DictReader(_stream_lines(url, run))
+
+
+def _stream_lines(url, run, compressed=True):
+    decompressor = bz2.BZ2Decompressor() if compressed else None
+    # utf-8-sig drops the byte order mark some downloads start with
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    with httpx.stream("GET", url) as response:
+        response.raise_for_status()
+        if run and "content-length" in response.headers:
+            run.total_bytes = int(response.headers["content-length"])
+        for chunk in response.iter_bytes(CHUNK_SIZE):
+            if run:
+                run.bytes_read += len(chunk)
+            # a chunk can end part way through a line, so the rest of it waits for the next chunk
+            if decompressor:
+                chunk = decompressor.decompress(chunk)
+            *lines, pending = (pending + decoder.decode(chunk)).split("\n")
+            for line in lines:
+                yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _upsert_epc_ratings(batch, keep_latest):
+    buffer = io.StringIO()
+    # every value is quoted so an empty rating is loaded as an empty string rather than as null
+    csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(
+        (position, row["uprn"], row["epc_rating"], row["date"]) for position, row in enumerate(batch)
+    )
+    buffer.seek(0)
+    if keep_latest:
+        order = "uprn, date DESC, position DESC"
+        condition = "WHERE portal_epcrating.date IS NULL OR EXCLUDED.date >= portal_epcrating.date"
+    else:
+        # like updating row by row, the last of any repeated uprn wins
+        order = "uprn, position DESC"
+        condition = ""
+    with connection.cursor() as cursor:
+        cursor.execute("TRUNCATE portal_epcrating_staging")
+        cursor.copy_expert(
+            "COPY portal_epcrating_staging (position, uprn, rating, date) FROM STDIN (FORMAT csv, FORCE_NULL (date))",
+            buffer,
+        )
+        # an upsert can only change each row once, so only one row of any uprn repeated in the batch is kept
+        cursor.execute(
+            "INSERT INTO portal_epcrating (uprn, rating, date, created_at, modified_at) "
+            "SELECT DISTINCT ON (uprn) uprn, rating, date, now(), now() FROM portal_epcrating_staging "
+            f"ORDER BY {order} "
+            "ON CONFLICT (uprn) DO UPDATE "
+            f"SET rating = EXCLUDED.rating, date = EXCLUDED.date, modified_at = EXCLUDED.modified_at {condition}"
+        )
+
+
+def read_certificate_rows(path):
+    """
+    The rows of every certificates.csv in the Open EPC bulk download, from the downloaded zip or a directory it has
+    been extracted to, or of a single certificates.csv.
+    """
+    path = pathlib.Path(path)
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path) as archive:
+            for name in sorted(archive.namelist()):
+                if name.endswith("certificates.csv"):
+                    print(f"Reading: {name}")  # noqa: T201
+                    with archive.open(name) as f:
+                        yield from csv.DictReader(io.TextIOWrapper(f, encoding="utf-8", newline=""))
+    else:
+        filepaths = sorted(path.glob("**/certificates.csv")) if path.is_dir() else [path]
+        for filepath in filepaths:
+            print(f"Reading: {filepath}")  # noqa: T201
+            with filepath.open(newline="", encoding="utf-8") as f:
+                yield from csv.DictReader(f)
+
+
+def _make_certificate(row):
+    return models.EpcCertificate(
+        lmk_key=row["LMK_KEY"],
+        uprn=row["UPRN"],
+        address1=row["ADDRESS1"],
+        address2=row["ADDRESS2"],
+        address3=row["ADDRESS3"],
+        posttown=row["POSTTOWN"],
+        postcode=row["POSTCODE"],
+        normalised_postcode=normalise_postcode(row["POSTCODE"]),
+        lodgement_date=row["LODGEMENT_DATE"],
+    )
+
+
+def write_certificates(rows, batch_size=1000):
+    print("Loading certificates to database")  # noqa: T201
+    rows = (row for row in rows if row["LMK_KEY"] and row["POSTCODE"])
+    count = 0
+    while batch := list(itertools.islice(rows, batch_size)):
+        # an upsert can only change each row once, so keep the last of any certificate repeated in the batch
+        certificates = {row["LMK_KEY"]: _make_certificate(row) for row in batch}
+        models.EpcCertificate.objects.bulk_create(
+            certificates.values(),
+            update_conflicts=True,
+            unique_fields=["lmk_key"],
+            update_fields=[
+                "uprn",
+                "address1",
+                "address2",
+                "address3",
+                "posttown",
+                "postcode",
+                "normalised_postcode",
+                "lodgement_date",
+                "modified_at",
+            ],
+        )
+        count += len(certificates)
+        print(f"Loaded {count} certificates")  # noqa: T201
+    print("Finished loading")  # noqa: T201
+
+
+# the raw statistics.gov.scot columns loaded into each ScottishEpcRating field
+scottish_epc_columns = {
+    "OSG_REFERENCE_NUMBER": "uprn",
+    "CURRENT_ENERGY_RATING": "rating",
+    "LODGEMENT_DATE": "date",
+    "PROPERTY_TYPE": "property_type",
+    "ADDRESS1": "address1",
+    "ADDRESS2": "address2",
+    "ADDRESS3": "address3",
+    "POSTCODE": "postcode",
+    "BUILDING_REFERENCE_NUMBER": "building_reference_number",
+    "POTENTIAL_ENERGY_RATING": "potential_rating",
+    "CURRENT_ENERGY_EFFICIENCY": "current_energy_efficiency_rating",
+    "POTENTIAL_ENERGY_EFFICIENCY": "potential_energy_efficiency_rating",
+    "BUILT_FORM": "built_form",
+    "INSPECTION_DATE": "inspection_date",
+    "LOCAL_AUTHORITY_LABEL": "local_authority",
+    "CONSTITUENCY_LABEL": "constituency",
+    "ENERGY_CONSUMPTION_CURRENT": "energy_consumption",
+    "ENERGY_CONSUMPTION_POTENTIAL": "potential_energy_consumption",
+    "CO2_EMISSIONS_CURRENT": "co2_emissions",
+    "CO2_EMISS_CURR_PER_FLOOR_AREA": "co2_emissions_per_floor_area",
+    "CO2_EMISSIONS_POTENTIAL": "co2_emissions_potential",
+    "TOTAL_FLOOR_AREA": "floor_area",
+    "FLOOR_LEVEL": "floor_level",
+    "FLOOR_HEIGHT": "floor_height",
+    "ENERGY_TARIFF": "energy_tariff",
+    "MAINS_GAS_FLAG": "mains_gas",
+    "MULTI_GLAZE_PROPORTION": "multiple_glazed_proportion",
+    "EXTENSION_COUNT": "extension_count",
+    "NUMBER_HABITABLE_ROOMS": "habitable_room_count",
+    "NUMBER_HEATED_ROOMS": "heated_room_count",
+    "FLOOR_DESCRIPTION": "floor_description",
+    "FLOOR_ENERGY_EFF": "floor_energy_efficiency",
+    "WINDOWS_DESCRIPTION": "windows_description",
+    "WALL_DESCRIPTION": "wall_description",
+    "WALL_ENERGY_EFF": "wall_energy_efficiency",
+    "WALL_ENV_EFF": "wall_environmental_efficiency",
+    "MAINHEAT_DESCRIPTION": "main_heating_description",
+    "MAINHEAT_ENERGY_EFF": "main_heating_energy_efficiency",
+    "MAINHEAT_ENV_EFF": "main_heating_environmental_efficiency",
+    "MAIN_FUEL": "main_heating_fuel_type",
+    "SECONDHEAT_DESCRIPTION": "second_heating_description",
+    "SHEATING_ENERGY_EFF": "second_heating_energy_efficiency",
+    "ROOF_DESCRIPTION": "roof_description",
+    "ROOF_ENERGY_EFF": "roof_energy_efficiency",
+    "ROOF_ENV_EFF": "roof_environmental_efficiency",
+    "LIGHTING_DESCRIPTION": "lighting_description",
+    "LIGHTING_ENERGY_EFF": "lighting_energy_efficiency",
+    "LIGHTING_ENV_EFF": "lighting_environmental_efficiency",
+    "MECHANICAL_VENTILATION": "mechanical_ventilation",
+    "CONSTRUCTION_AGE_BAND": "construction_age_band",
+    "TENURE": "tenure",
+    "IMPROVEMENTS": "improvements",
+    "ALTERNATIVE_IMPROVEMENTS": "alternative_improvements",
+}
+
+
+def read_scottish_epc_rows(path_or_url):
+    """
+    The certificates in a domestic EPC CSV from statistics.gov.scot, read a line at a time from a file or as it's
+    downloaded from a url.
+    """
+    if str(path_or_url).startswith(("http://", "https://")):
+        yield from _read_scottish_epc_lines(_stream_lines(path_or_url, None, compressed=False))
+    else:
+        with pathlib.Path(path_or_url).open(newline="", encoding="utf-8-sig") as f:
+            yield from _read_scottish_epc_lines(f)
+
+
+def _read_scottish_epc_lines(lines):
+    reader = csv.DictReader(lines)
+    missing_columns = set(scottish_epc_columns) - set(reader.fieldnames or ())
+    if missing_columns:
+        raise ValueError(f"The Scottish EPC CSV is missing columns: {', '.join(sorted(missing_columns))}")
+    # the row after the header describes each column rather than being a certificate
+    next(reader, None)
+    for row in reader:
+        if row["OSG_REFERENCE_NUMBER"]:
+            yield row
+
+
+def write_scottish_epcs(rows, batch_size=10000):
+    """
+    Upsert the Scottish EPCs in batches, keeping the certificate with the latest lodgement date for each uprn.
+
+    Like the EPC ratings, each batch is copied into a temporary staging table and merged with a single upsert.
+    """
+    print("Loading Scottish EPCs to database")  # noqa: T201
+    fields = [models.ScottishEpcRating._meta.get_field(name) for name in scottish_epc_columns.values()]
+    columns = ", ".join(field.column for field in fields)
+    updates = ", ".join(f"{field.column} = EXCLUDED.{field.column}" for field in fields if field.column != "uprn")
+    with connection.cursor() as cursor:
+        column_types = ", ".join(f"{field.column} {field.db_type(connection)}" for field in fields)
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE IF NOT EXISTS portal_scottishepcrating_staging (position integer, {column_types})"
+        )
+
+    rows = iter(rows)
+    count = 0
+    start = time.monotonic()
+    while batch := list(itertools.islice(rows, batch_size)):
+        buffer = io.StringIO()
+        # every value is quoted so empty text is loaded as it is rather than as null, except for empty dates
+        csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(
+            (position, *(row[column] for column in scottish_epc_columns)) for position, row in enumerate(batch)
+        )
+        buffer.seek(0)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("TRUNCATE portal_scottishepcrating_staging")
+            cursor.copy_expert(
+                f"COPY portal_scottishepcrating_staging (position, {columns}) "
+                "FROM STDIN (FORMAT csv, FORCE_NULL (date))",
+                buffer,
+            )
+            cursor.execute(
+                f"INSERT INTO portal_scottishepcrating ({columns}, created_at, modified_at) "
+                f"SELECT DISTINCT ON (uprn) {columns}, now(), now() FROM portal_scottishepcrating_staging "
+                "ORDER BY uprn, date DESC NULLS LAST, position DESC "
+                f"ON CONFLICT (uprn) DO UPDATE SET {updates}, modified_at = EXCLUDED.modified_at "
+                "WHERE portal_scottishepcrating.date IS NULL OR EXCLUDED.date >= portal_scottishepcrating.date"
             )
+        count += len(batch)
+        rate = count / max(time.monotonic() - start, 1e-6)
+        print(f"Loaded {count} Scottish EPCs ({rate:.0f} rows/s)")  # noqa: T201
     print("Finished loading")  # noqa: T201
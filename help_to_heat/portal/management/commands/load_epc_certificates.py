@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from help_to_heat.portal import epc_writer
+
+
+class Command(BaseCommand):
+    help = "Load or refresh the England and Wales EPC certificates used to search for addresses"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            type=str,
+            help="The Open EPC bulk download zip, a directory it's extracted to, or a certificates.csv",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000, help="How many certificates to write at once")
+
+    def handle(self, *args, **kwargs):
+        rows = epc_writer.read_certificate_rows(kwargs["path"])
+        epc_writer.write_certificates(rows, batch_size=kwargs["batch_size"])
@@ -1,4 +1,4 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 from help_to_heat.portal import epc_writer
 
@@ -8,9 +8,29 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("-u", "--url", type=str, help="The url to download")
+        parser.add_argument(
+            "--sort-memory-mb",
+            type=int,
+            default=epc_writer.SORT_MEMORY_BUDGET // (1024 * 1024),
+            help="How much of the download to hold in memory at once while sorting it",
+        )
+        parser.add_argument(
+            "--stream",
+            action="store_true",
+            help="Load straight from the download as it arrives, without saving or sorting it first",
+        )
+        parser.add_argument("--batch-size", type=int, default=10000, help="How many ratings to write at once")
 
     def handle(self, *args, **kwargs):
-        url = kwargs["url"]
-        sorted_filepath = epc_writer.save_url_in_chunks(url)
-        rows = epc_writer.read_rows(sorted_filepath)
-        epc_writer.write_rows(rows)
+        try:
+            self._load(kwargs["url"], kwargs)
+        except epc_writer.LoadRunInProgressException as e:
+            raise CommandError(str(e))
+
+    def _load(self, url, kwargs):
+        if kwargs["stream"]:
+            epc_writer.stream_url_to_database(url, batch_size=kwargs["batch_size"])
+            return
+        epc_writer.load_url_to_database(
+            url, sort_memory_budget=kwargs["sort_memory_mb"] * 1024 * 1024, batch_size=kwargs["batch_size"]
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from help_to_heat.portal import epc_writer
+
+
+class Command(BaseCommand):
+    help = "Load or refresh the Scottish EPCs from the statistics.gov.scot domestic EPC CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=str, help="The path or url of the CSV")
+        parser.add_argument("--batch-size", type=int, default=10000, help="How many EPCs to write at once")
+
+    def handle(self, *args, **kwargs):
+        rows = epc_writer.read_scottish_epc_rows(kwargs["path"])
+        epc_writer.write_scottish_epcs(rows, batch_size=kwargs["batch_size"])
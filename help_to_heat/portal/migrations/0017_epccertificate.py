@@ -0,0 +1,33 @@
+# Generated by Django 5.1.8 on 2026-10-18 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0016_increase_test_length_limit_on_scottishepc_numeric_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EpcCertificate",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("modified_at", models.DateTimeField(auto_now=True)),
+                ("lmk_key", models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ("uprn", models.CharField(blank=True, default="", max_length=12)),
+                ("address1", models.TextField(blank=True, default="")),
+                ("address2", models.TextField(blank=True, default="")),
+                ("address3", models.TextField(blank=True, default="")),
+                ("posttown", models.TextField(blank=True, default="")),
+                ("postcode", models.CharField(max_length=10)),
+                ("normalised_postcode", models.CharField(db_index=True, max_length=8)),
+                ("lodgement_date", models.DateField()),
+            ],
+            options={
+                "ordering": ["created_at"],
+                "abstract": False,
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.8 on 2026-10-18 18:13
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0017_epccertificate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EpcLoadRun",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("modified_at", models.DateTimeField(auto_now=True)),
+                ("url", models.TextField()),
+                ("streamed", models.BooleanField(default=False)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("running", "Running"), ("failed", "Failed"), ("completed", "Completed")],
+                        default="running",
+                        max_length=16,
+                    ),
+                ),
+                ("latest_date", models.DateField()),
+                ("rows_read", models.BigIntegerField(default=0)),
+                ("rows_written", models.BigIntegerField(default=0)),
+                ("batches_committed", models.IntegerField(default=0)),
+                ("bytes_read", models.BigIntegerField(default=0)),
+                ("total_bytes", models.BigIntegerField(blank=True, null=True)),
+                ("started_at", models.DateTimeField(auto_now_add=True)),
+                ("last_batch_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("error", models.TextField(blank=True, default="")),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.8 on 2026-10-18 19:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0018_epcloadrun"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="epcloadrun",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("downloading", "Downloading"),
+                    ("running", "Running"),
+                    ("failed", "Failed"),
+                    ("completed", "Completed"),
+                ],
+                default="running",
+                max_length=16,
+            ),
+        ),
+    ]
@@ -11,6 +11,13 @@ from django_use_email_as_username.models import BaseUser, BaseUserManager
 from help_to_heat import utils
 
 epc_rating_choices = tuple((letter, letter) for letter in string.ascii_letters.upper()[:8])
+epc_load_run_status_choices = (
+    ("downloading", "Downloading"),
+    ("running", "Running"),
+    ("failed", "Failed"),
+    ("completed", "Completed"),
+)
+epc_load_run_in_progress_statuses = ("downloading", "running")
 
 logger = logging.getLogger(__name__)
 
@@ -215,3 +222,55 @@ class ScottishEpcRating(utils.TimeStampedModel):
     tenure = models.TextField(null=True)
     improvements = models.TextField(null=True)
     alternative_improvements = models.TextField(null=True)
+
+
+# certificates for England and Wales from the Open EPC bulk download, so searches don't need the Open EPC API
+class EpcCertificate(utils.TimeStampedModel):
+    lmk_key = models.CharField(max_length=64, primary_key=True)
+    uprn = models.CharField(max_length=12, blank=True, default="")
+    address1 = models.TextField(blank=True, default="")
+    address2 = models.TextField(blank=True, default="")
+    address3 = models.TextField(blank=True, default="")
+    posttown = models.TextField(blank=True, default="")
+    postcode = models.CharField(max_length=10)
+    # upper case without spaces, which is what searches are by
+    normalised_postcode = models.CharField(max_length=8, db_index=True)
+    lodgement_date = models.DateField()
+
+    def __str__(self):
+        return f"<EpcCertificate lmk_key={self.lmk_key}>"
+
+
+class EpcLoadRun(utils.UUIDPrimaryKeyBase, utils.TimeStampedModel):
+    url = models.TextField()
+    # streamed rows are in the order they were downloaded rather than sorted, so can't be resumed from a sorted load
+    streamed = models.BooleanField(default=False)
+    status = models.CharField(max_length=16, choices=epc_load_run_status_choices, default="running")
+    # rows from before this date are skipped, it's kept so a resumed load skips the same rows
+    latest_date = models.DateField()
+    # how many rows of the source have been read and committed, a resumed load carries on from the row after
+    rows_read = models.BigIntegerField(default=0)
+    rows_written = models.BigIntegerField(default=0)
+    batches_committed = models.IntegerField(default=0)
+    bytes_read = models.BigIntegerField(default=0)
+    total_bytes = models.BigIntegerField(blank=True, null=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    last_batch_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True, default="")
+
+    def __str__(self):
+        return f"<EpcLoadRun url={self.url} status={self.status}>"
+
+    @property
+    def rows_per_second(self):
+        if not self.last_batch_at:
+            return None
+        elapsed = (self.last_batch_at - self.started_at).total_seconds()
+        return self.rows_read / elapsed if elapsed > 0 else None
+
+    @property
+    def percent_read(self):
+        if not self.total_bytes:
+            return None
+        return min(100 * self.bytes_read / self.total_bytes, 100)
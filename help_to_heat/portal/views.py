@@ -3,8 +3,8 @@ import logging
 import subprocess
 import urllib.parse
 
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db import connection
 from django.http import JsonResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
@@ -12,8 +12,9 @@ from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 
 from help_to_heat import utils
+from help_to_heat.frontdoor import caches, circuit_breakers, routing
 
-from . import decorators, models
+from . import decorators, epc_writer, models
 
 logger = logging.getLogger("django.request")
 logger.setLevel(logging.ERROR)
@@ -220,7 +221,17 @@ def team_member_homepage_view(request):
 @require_http_methods(["GET"])
 def healthcheck_view(request):
     _ = models.User.objects.exists()
-    data = {"healthy": True, "datetime": timezone.now()}
+    data = {
+        "healthy": True,
+        "datetime": timezone.now(),
+        # open breakers mean an API is failing, the fallback routes still work so the service is still healthy
+        "circuit_breakers": circuit_breakers.get_circuit_breaker_states(),
+        # counted since this worker started, to see how well the caches are working
+        "caches": {
+            "postcode_addresses": caches.postcode_address_cache.info(),
+            "journeys": routing.journey_cache_info(),
+        },
+    }
     return JsonResponse(data, status=201)
 
 
@@ -234,19 +245,26 @@ class EPCUploadView(utils.MethodDispatcher):
     )
 
     def get(self, request):
-        with connection.cursor() as cursor:
-            query = "SELECT COUNT(*) FROM portal_epcrating"
-            cursor.execute(query)
-            epc_count = cursor.fetchone()
+        epc_writer.mark_stale_load_runs()
+        load_runs = models.EpcLoadRun.objects.order_by("-started_at")[:5]
         template = "portal/epc-page.html"
         return render(
             request,
             template_name=template,
-            context={"epc_count": epc_count},
+            context={
+                "load_runs": load_runs,
+                "is_loading": any(
+                    load_run.status in models.epc_load_run_in_progress_statuses for load_run in load_runs
+                ),
+            },
         )
 
     def post(self, request):
         url = request.POST["url"]
+        epc_writer.mark_stale_load_runs()
+        if models.EpcLoadRun.objects.filter(status__in=models.epc_load_run_in_progress_statuses).exists():
+            messages.error(request, "An upload is already running, wait for it to finish before starting another")
+            return redirect("/portal/epc-uploads")
         cmd_args = self.args + (url,)
         subprocess.Popen(cmd_args)
         return redirect("/portal/epc-uploads")
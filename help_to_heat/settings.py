@@ -77,6 +77,8 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
     "help_to_heat.middleware.RequestLoggingMiddleware",  # at the bottom to only log requests that aren't blocked
+    "help_to_heat.middleware.SessionCacheMiddleware",
+    "help_to_heat.middleware.EventBufferMiddleware",
 ]
 
 
@@ -160,7 +162,23 @@ DATABASES = {
     "default": {
         **env.db("DATABASE_URL"),
         **{"ATOMIC_REQUESTS": True},
-    }
+    },
+    # the same database, used by the shared cache so what it stores isn't rolled back along with a failed request
+    "cache": env.db("DATABASE_URL"),
+}
+DATABASE_ROUTERS = ["help_to_heat.frontdoor.caches.SharedCacheRouter"]
+
+# "default" is local to each worker, "shared" is a table every worker reads, created by the createcachetable command
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": env.int("LOCAL_CACHE_MAX_ENTRIES", default=1000)},
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "frontdoor_shared_cache",
+        "OPTIONS": {"MAX_ENTRIES": env.int("SHARED_CACHE_MAX_ENTRIES", default=100000)},
+    },
 }
 
 AUTHENTICATION_BACKENDS = [
@@ -251,9 +269,70 @@ LOGGING = {
 }
 
 OS_API_KEY = env.str("OS_API_KEY")
+# how many pages of OS Places results are requested at once for postcodes with more than one page of addresses
+OS_API_MAX_CONCURRENT_REQUESTS = env.int("OS_API_MAX_CONCURRENT_REQUESTS", default=4)
+# how long an OS API key that has hit its usage limit is left before it's tried again
+OS_API_KEY_COOLDOWN_SECONDS = env.int("OS_API_KEY_COOLDOWN_SECONDS", default=60)
+# how often each worker adds the OS API key uses it has counted to the shared cache and reads back everyone else's
+OS_API_KEY_USAGE_SYNC_SECONDS = env.int("OS_API_KEY_USAGE_SYNC_SECONDS", default=30)
 OPEN_EPC_API_TOKEN = env.str("OPEN_EPC_API_TOKEN")
 OPEN_EPC_API_BASE_URL = env.str("OPEN_EPC_API_BASE_URL")
 
+# every request to the EPC and OS APIs goes through help_to_heat.frontdoor.http_client, with these per endpoint
+OUTBOUND_HTTP_TIMEOUTS = {
+    "epc": env.float("EPC_API_TIMEOUT", default=10),
+    "os": env.float("OS_API_TIMEOUT", default=10),
+}
+OUTBOUND_HTTP_RETRIES = {
+    "epc": env.int("EPC_API_RETRIES", default=2),
+    "os": env.int("OS_API_RETRIES", default=2),
+}
+# connections kept open to each host, per worker
+OUTBOUND_HTTP_POOL_SIZE = env.int("OUTBOUND_HTTP_POOL_SIZE", default=10)
+# EPC certificates are fetched by up to this many threads per worker
+EPC_API_MAX_CONCURRENT_REQUESTS = env.int("EPC_API_MAX_CONCURRENT_REQUESTS", default=10)
+# how long selecting an EPC waits for its certificate
+EPC_LOOKUP_DEADLINE_SECONDS = env.float("EPC_LOOKUP_DEADLINE_SECONDS", default=8)
+# recommendations are only needed for the referral, "background" fetches them once the EPC is selected without the
+# user waiting, "immediate" fetches them before the response is sent
+EPC_RECOMMENDATIONS_FETCH_POLICY = env.str("EPC_RECOMMENDATIONS_FETCH_POLICY", default="background")
+EPC_RECOMMENDATIONS_ATTEMPTS = env.int("EPC_RECOMMENDATIONS_ATTEMPTS", default=3)
+EPC_RECOMMENDATIONS_RETRY_DELAY_SECONDS = env.float("EPC_RECOMMENDATIONS_RETRY_DELAY_SECONDS", default=5)
+# background recommendations are fetched by up to this many threads per worker, apart from the certificates' threads
+EPC_RECOMMENDATIONS_MAX_CONCURRENT_FETCHES = env.int("EPC_RECOMMENDATIONS_MAX_CONCURRENT_FETCHES", default=4)
+# an EPC load that hasn't committed a batch for this long has stopped, and is marked as failed so it can be resumed
+EPC_LOAD_RUN_STALE_SECONDS = env.int("EPC_LOAD_RUN_STALE_SECONDS", default=15 * 60)
+# calls to an endpoint fail straight away for CIRCUIT_BREAKER_RESET_SECONDS after this many fail in a row
+# a call fails if it errors or takes longer than CIRCUIT_BREAKER_SLOW_CALL_SECONDS
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = env.int("CIRCUIT_BREAKER_FAILURE_THRESHOLD", default=5)
+CIRCUIT_BREAKER_SLOW_CALL_SECONDS = env.float("CIRCUIT_BREAKER_SLOW_CALL_SECONDS", default=5)
+CIRCUIT_BREAKER_RESET_SECONDS = env.float("CIRCUIT_BREAKER_RESET_SECONDS", default=30)
+
+# where session answers are kept, one of the stores in help_to_heat.frontdoor.session_stores
+SESSION_STORE = env.str("SESSION_STORE", default="help_to_heat.frontdoor.session_stores.SnapshotSessionStore")
+
+# skip re-serialising answers read back from the session store, they were checked by the same schema when saved
+TRUST_INTERNAL_DATA = env.bool("TRUST_INTERNAL_DATA", default=False)
+
+# "request" buffers events and writes them once the response is ready, "immediate" writes each one as it happens
+EVENT_FLUSH_POLICY = env.str("EVENT_FLUSH_POLICY", default="request")
+EVENT_BUFFER_MAX_SIZE = env.int("EVENT_BUFFER_MAX_SIZE", default=100)
+
+# OS Places results are cached by postcode, and refetched once older than ADDRESS_CACHE_TTL seconds
+# older results are still used while OS Places is unavailable, until they're ADDRESS_CACHE_STALE_TTL seconds old
+ADDRESS_CACHE_TTL = env.int("ADDRESS_CACHE_TTL", default=60 * 60 * 24)
+ADDRESS_CACHE_STALE_TTL = env.int("ADDRESS_CACHE_STALE_TTL", default=60 * 60 * 24 * 30)
+
+# EPC API responses are cached, certificates and their recommendations don't change once lodged
+# searches are refetched more often so newly lodged certificates are found
+EPC_CERTIFICATE_CACHE_TTL = env.int("EPC_CERTIFICATE_CACHE_TTL", default=60 * 60 * 24 * 30)
+EPC_SEARCH_CACHE_TTL = env.int("EPC_SEARCH_CACHE_TTL", default=60 * 60 * 24)
+# certificates loaded with load_epc_certificates longer ago than this are checked against the Open EPC API's search
+EPC_LOCAL_CERTIFICATES_TTL = env.int("EPC_LOCAL_CERTIFICATES_TTL", default=60 * 60 * 24 * 30)
+
+# how long entries read from the shared cache are also kept in each worker's memory
+LOCAL_CACHE_TTL = env.int("LOCAL_CACHE_TTL", default=60 * 5)
+
 TOTP_ISSUER = "Help to Heat Supplier Portal"
 
 # origins don't have a trailing slash, the BASE_URL does so must be trimmed
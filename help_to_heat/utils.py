@@ -5,6 +5,7 @@ import hashlib
 import inspect
 import itertools
 import secrets
+import threading
 import types
 import uuid
 from datetime import datetime
@@ -118,20 +119,76 @@ class DuplicateEvent(Exception):
     pass
 
 
+@functools.cache
+def get_signature(func):
+    return inspect.signature(func)
+
+
 def get_arguments(func, *args, **kwargs):
     """Calculate what the args would be inside a function"""
-    sig = inspect.signature(func)
+    sig = get_signature(func)
     bound_args = sig.bind(*args, **kwargs)
     bound_args.apply_defaults()
     arguments = bound_args.arguments
     return arguments
 
 
+class EventBuffer:
+    """
+    Events waiting to be written, flushed together with bulk_create.
+
+    The buffer flushes itself once it holds max_size events so a long-running request can't grow it without limit.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.events = []
+
+    def add(self, event):
+        self.events.append(event)
+        if len(self.events) >= self.max_size:
+            self.flush()
+
+    def flush(self):
+        events, self.events = self.events, []
+        for EventModel, model_events in itertools.groupby(events, key=type):  # noqa N806
+            EventModel.objects.bulk_create(list(model_events))
+
+    def discard(self):
+        self.events = []
+
+
+_event_buffer = threading.local()
+
+
+def start_event_buffer():
+    _event_buffer.buffer = EventBuffer(settings.EVENT_BUFFER_MAX_SIZE)
+
+
+def get_event_buffer():
+    return getattr(_event_buffer, "buffer", None)
+
+
+def end_event_buffer(flush=True):
+    buffer = get_event_buffer()
+    _event_buffer.buffer = None
+    if buffer is None:
+        return
+    if flush:
+        buffer.flush()
+    else:
+        buffer.discard()
+
+
 def _register_event(EventModel, event_name, arguments):  # noqa N803
     event_names.add(event_name)
     arguments = {key: value for (key, value) in arguments.items() if key != "self"}
     event = EventModel(name=event_name, data=arguments)
-    event.save()
+    buffer = get_event_buffer()
+    if buffer is None:
+        event.save()
+    else:
+        buffer.add(event)
 
 
 def resolve_schema(schema):
@@ -176,23 +233,30 @@ def apply_schema(schema, data, load_or_dump):
     return arguments
 
 
-def with_schema(default=None, load=None, dump=None):
+def with_schema(default=None, load=None, dump=None, trusted=False):
     """Applies the load_schema.load on the arguments to the function,
     and dump_schema.dump on the result of the function.
 
     This ensures that validation has been passed and that the result of the
-    function is JSON serialisable"""
-    load_schema = load or default
-    dump_schema = dump or default
+    function is JSON serialisable
+
+    Functions marked as trusted only return data that was dumped by the same schema
+    when it was saved, so the dump is skipped when settings.TRUST_INTERNAL_DATA is on"""
+    # schemas keep no state between calls, so one instance of each is shared by every call
+    load_schema = resolve_schema(load or default)
+    dump_schema = resolve_schema(dump or default)
 
     def _decorator(func):
+        get_signature(func)
+
         @functools.wraps(func)
         def _inner(*args, **kwargs):
             arguments = get_arguments(func, *args, **kwargs)
             bound_func, arguments = process_self(func, arguments)
             arguments = apply_schema(load_schema, arguments, "load")
             result = bound_func(**arguments)
-            result = apply_schema(dump_schema, result, "dump")
+            if not (trusted and settings.TRUST_INTERNAL_DATA):
+                result = apply_schema(dump_schema, result, "dump")
             return result
 
         return _inner
@@ -269,6 +333,3 @@ def get_most_recent_epc_per_uprn(address_and_lmk_details):
         most_recent_address_and_lmk_details.append(latest_epc)
 
     return most_recent_address_and_lmk_details
-
-
-default_api_timeout = 10
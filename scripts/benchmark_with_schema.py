@@ -0,0 +1,94 @@
+# Measures the time utils.with_schema adds to each call of a session read like Session.get_answer, compared with
+# building the schemas and reading the signature on every call as it used to
+# Run from the repository root: python scripts/benchmark_with_schema.py
+
+import functools
+import inspect
+import pathlib
+import sys
+import timeit
+import uuid
+
+import django
+import marshmallow
+from django.conf import settings
+
+__here__ = pathlib.Path(__file__).parent
+sys.path.insert(0, str(__here__.parent))
+
+settings.configure(TRUST_INTERNAL_DATA=False)
+django.setup()
+
+from help_to_heat import utils  # noqa: E402
+from help_to_heat.frontdoor import schemas  # noqa: E402
+
+NUMBER = 20000
+
+answer = {
+    "country": "England",
+    "own_property": "Yes, I own my property and live in it",
+    "address": "10, DOWNING STREET, LONDON, CITY OF WESTMINSTER, SW1A 2AA",
+    "uprn": "001234567890",
+    "council_tax_band": "A",
+    "epc_details": {"current-energy-rating": "D", "lodgement-date": "2020-01-01"},
+    "schemes": ["GBIS", "ECO4"],
+    "supplier": "British Gas",
+}
+
+
+class GetAnswerSchema(marshmallow.Schema):
+    session_id = marshmallow.fields.UUID()
+    page_name = marshmallow.fields.String()
+
+
+class Session:
+    def get_answer(self, session_id, page_name):
+        return answer
+
+
+def with_schema_before(load, dump):
+    """with_schema as it was before it cached signatures and schema instances, to compare against"""
+
+    def _decorator(func):
+        @functools.wraps(func)
+        def _inner(*args, **kwargs):
+            bound_args = inspect.signature(func).bind(*args, **kwargs)
+            bound_args.apply_defaults()
+            bound_func, arguments = utils.process_self(func, bound_args.arguments)
+            arguments = load().load(arguments)
+            return dump().dump(bound_func(**arguments))
+
+        return _inner
+
+    return _decorator
+
+
+def time_per_call(func):
+    session_id = uuid.uuid4()
+    seconds = timeit.timeit(lambda: func(session_id=session_id, page_name="address"), number=NUMBER)
+    return seconds / NUMBER * 1_000_000
+
+
+def main():
+    session = Session()
+    plain = time_per_call(session.get_answer)
+    print(f"undecorated: {plain:.1f}µs per call")  # noqa: T201
+
+    Session.before = with_schema_before(load=GetAnswerSchema, dump=schemas.SessionSchema)(Session.get_answer)
+    before = time_per_call(session.before)
+    print(f"with_schema before caching: {before:.1f}µs per call, {before - plain:.1f}µs overhead")  # noqa: T201
+
+    Session.validated = utils.with_schema(load=GetAnswerSchema, dump=schemas.SessionSchema)(Session.get_answer)
+    validated = time_per_call(session.validated)
+    print(f"with_schema: {validated:.1f}µs per call, {validated - plain:.1f}µs overhead")  # noqa: T201
+
+    Session.trusted = utils.with_schema(load=GetAnswerSchema, dump=schemas.SessionSchema, trusted=True)(
+        Session.get_answer
+    )
+    settings.TRUST_INTERNAL_DATA = True
+    trusted = time_per_call(session.trusted)
+    print(f"with_schema trusted: {trusted:.1f}µs per call, {trusted - plain:.1f}µs overhead")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
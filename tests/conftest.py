@@ -1,6 +1,10 @@
 import pytest
+from django.core.cache import caches
 
 import help_to_heat
+from help_to_heat.frontdoor.caches import postcode_address_cache
+from help_to_heat.frontdoor.circuit_breakers import reset_circuit_breakers
+from help_to_heat.frontdoor.os_api import reset_key_usage
 
 
 @pytest.fixture(autouse=True)
@@ -8,3 +12,19 @@ def reset_referrals():
     yield
 
     help_to_heat.portal.models.Referral.objects.all().delete()
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    # tests mock OS Places with different responses for the same postcodes
+    for cache in caches.all():
+        cache.clear()
+    postcode_address_cache.reset_info()
+    reset_key_usage()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_breakers():
+    reset_circuit_breakers()
+    yield
@@ -0,0 +1,84 @@
+import time
+import unittest.mock
+
+import pytest
+from django.core.cache import caches
+from django.test import override_settings
+
+from help_to_heat.frontdoor import interface
+from help_to_heat.frontdoor.caches import (
+    normalise_postcode,
+    postcode_address_cache,
+)
+from help_to_heat.frontdoor.mock_os_api import MockOSApi
+from help_to_heat.frontdoor.os_api import ThrottledApiException
+
+
+class CountingOSApi(MockOSApi):
+    calls = 0
+
+    def get_by_postcode(self, postcode, offset, max_results):
+        CountingOSApi.calls += 1
+        return super().get_by_postcode(postcode, offset, max_results)
+
+
+class ThrottledOSApi(MockOSApi):
+    def get_by_postcode(self, postcode, offset, max_results):
+        raise ThrottledApiException
+
+
+class UnavailableOSApi(MockOSApi):
+    def get_by_postcode(self, postcode, offset, max_results):
+        return []
+
+
+def test_normalise_postcode():
+    assert normalise_postcode(" sw1a  2aa ") == "SW1A2AA"
+    assert normalise_postcode("SW1A2AA") == "SW1A2AA"
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.OSApi", CountingOSApi)
+def test_addresses_are_cached_by_postcode():
+    CountingOSApi.calls = 0
+    results = interface.get_addresses_from_api("SW1A 2AA")
+    assert results
+    assert CountingOSApi.calls == 1
+
+    assert interface.get_addresses_from_api("sw1a2aa") == results
+    assert CountingOSApi.calls == 1
+    assert postcode_address_cache.info() == {"local_hits": 1, "shared_hits": 0, "misses": 1}
+
+    # another worker only has the shared cache
+    caches["default"].clear()
+    assert interface.get_addresses_from_api("SW1A 2AA") == results
+    assert CountingOSApi.calls == 1
+    assert postcode_address_cache.info() == {"local_hits": 1, "shared_hits": 1, "misses": 1}
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.OSApi", CountingOSApi)
+def test_stale_addresses_are_refetched():
+    CountingOSApi.calls = 0
+    interface.get_addresses_from_api("SW1A 2AA")
+    with override_settings(ADDRESS_CACHE_TTL=60):
+        with unittest.mock.patch("time.time", return_value=time.time() + 120):
+            interface.get_addresses_from_api("SW1A 2AA")
+    assert CountingOSApi.calls == 2
+
+
+def test_stale_addresses_are_used_when_throttled():
+    with unittest.mock.patch("help_to_heat.frontdoor.interface.OSApi", MockOSApi):
+        results = interface.get_addresses_from_api("SW1A 2AA")
+
+    with override_settings(ADDRESS_CACHE_TTL=0):
+        with unittest.mock.patch("help_to_heat.frontdoor.interface.OSApi", ThrottledOSApi):
+            assert interface.get_addresses_from_api("SW1A 2AA") == results
+            with pytest.raises(ThrottledApiException):
+                interface.get_addresses_from_api("FL23 4JA")
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.OSApi", UnavailableOSApi)
+def test_failed_lookups_are_not_cached():
+    assert interface.get_addresses_from_api("SW1A 2AA") == []
+
+    with unittest.mock.patch("help_to_heat.frontdoor.interface.OSApi", MockOSApi):
+        assert interface.get_addresses_from_api("SW1A 2AA")
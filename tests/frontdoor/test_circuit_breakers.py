@@ -0,0 +1,121 @@
+import unittest.mock
+import uuid
+
+import pytest
+import requests
+import requests_mock
+from django.test import override_settings
+
+from help_to_heat.frontdoor import circuit_breakers, http_client, interface
+from help_to_heat.frontdoor.circuit_breakers import (
+    CircuitBreaker,
+    CircuitOpenException,
+)
+from help_to_heat.frontdoor.mock_epc_api import MockEPCApi
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock):
+    return CircuitBreaker("test", failure_threshold=3, slow_call_seconds=2, reset_seconds=30, clock=clock)
+
+
+def test_opens_after_failures_in_a_row():
+    breaker = make_breaker(Clock())
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_call(0.1, failed=True)
+    breaker.before_call()
+    breaker.record_call(0.1, failed=False)
+    assert breaker.state == circuit_breakers.closed
+
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_call(0.1, failed=True)
+    assert breaker.state == circuit_breakers.opened
+    with pytest.raises(CircuitOpenException):
+        breaker.before_call()
+
+
+def test_slow_calls_are_failures():
+    breaker = make_breaker(Clock())
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_call(5, failed=False)
+    assert breaker.state == circuit_breakers.opened
+
+
+def test_probes_when_half_open():
+    clock = Clock()
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        breaker.record_call(0.1, failed=True)
+
+    clock.now = 31
+    breaker.before_call()
+    assert breaker.state == circuit_breakers.half_open
+    # only one probe at a time
+    with pytest.raises(CircuitOpenException):
+        breaker.before_call()
+
+    breaker.record_call(0.1, failed=True)
+    assert breaker.state == circuit_breakers.opened
+
+    clock.now = 62
+    breaker.before_call()
+    breaker.record_call(0.1, failed=False)
+    assert breaker.state == circuit_breakers.closed
+    breaker.before_call()
+
+
+def test_http_client_fails_fast_once_open():
+    with requests_mock.Mocker() as m:
+        m.get("https://api.os.uk/search/places/v1/uprn", status_code=503)
+        for _ in range(5):
+            response = http_client.get("os", "https://api.os.uk/search/places/v1/uprn?uprn=1")
+            assert response.status_code == 503
+        assert circuit_breakers.get_circuit_breaker_states() == {"os": circuit_breakers.opened}
+
+        with pytest.raises(CircuitOpenException):
+            http_client.get("os", "https://api.os.uk/search/places/v1/uprn?uprn=1")
+        assert m.call_count == 5
+
+
+def test_http_client_counts_connection_errors():
+    with requests_mock.Mocker() as m:
+        m.get("https://api.os.uk/search/places/v1/uprn", exc=requests.exceptions.ConnectTimeout)
+        for _ in range(5):
+            with pytest.raises(requests.exceptions.ConnectTimeout):
+                http_client.get("os", "https://api.os.uk/search/places/v1/uprn?uprn=1")
+    assert circuit_breakers.get_circuit_breaker_states() == {"os": circuit_breakers.opened}
+
+
+class OpenCircuitRecommendationsEPCApi(MockEPCApi):
+    def get_epc_recommendations(self, lmk):
+        raise CircuitOpenException
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.EPCApi", OpenCircuitRecommendationsEPCApi)
+@override_settings(EPC_RECOMMENDATIONS_RETRY_DELAY_SECONDS=0)
+def test_open_circuit_skips_recommendations():
+    session_id = uuid.uuid4()
+    lmk = "1111111111111111111111111111111111"
+    interface.api.session.save_answer(session_id, "epc-select", {"lmk": lmk, "recommendations": []})
+
+    interface.api.epc.schedule_recommendations(session_id, lmk)
+
+    assert interface.api.session.get_answer(session_id, "epc-select")["recommendations"] == []
+
+
+def test_open_circuit_finds_no_addresses():
+    breaker = circuit_breakers.get_circuit_breaker("os")
+    for _ in range(breaker.failure_threshold):
+        breaker.record_call(0.1, failed=True)
+
+    assert interface.api.address.find_addresses("10", "SW1A 2AA") == []
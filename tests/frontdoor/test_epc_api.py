@@ -0,0 +1,57 @@
+import pytest
+import requests
+import requests_mock
+from django.conf import settings
+
+from help_to_heat.frontdoor.epc_api import EPCApi
+from help_to_heat.frontdoor.mock_epc_api import load_test_reponse
+
+lmk = "1111111111111111111111111111111111"
+
+
+def test_certificates_are_cached_by_lmk():
+    with requests_mock.Mocker() as m:
+        m.get(f"{settings.OPEN_EPC_API_BASE_URL}/certificate/{lmk}", json=load_test_reponse("sample_epc_response.json"))
+        first = EPCApi().get_epc_details(lmk)
+        second = EPCApi().get_epc_details(lmk)
+        assert m.call_count == 1
+    assert first == second
+
+
+def test_recommendations_are_cached_separately():
+    with requests_mock.Mocker() as m:
+        m.get(f"{settings.OPEN_EPC_API_BASE_URL}/certificate/{lmk}", json=load_test_reponse("sample_epc_response.json"))
+        m.get(
+            f"{settings.OPEN_EPC_API_BASE_URL}/recommendations/{lmk}",
+            json=load_test_reponse("sample_epc_recommendations_response.json"),
+        )
+        EPCApi().get_epc_details(lmk)
+        recommendations = EPCApi().get_epc_recommendations(lmk)
+        assert EPCApi().get_epc_recommendations(lmk) == recommendations
+        assert m.call_count == 2
+    assert "improvement-item" in recommendations["rows"][0]
+
+
+def test_searches_are_cached_by_postcode_and_building():
+    with requests_mock.Mocker() as m:
+        m.get(f"{settings.OPEN_EPC_API_BASE_URL}/search", json=load_test_reponse("sample_search_response.json"))
+        EPCApi().search_epc_details("22", "FL23 4JA")
+        EPCApi().search_epc_details("22 ", "fl234ja")
+        assert m.call_count == 1
+        EPCApi().search_epc_details("23", "FL23 4JA")
+        assert m.call_count == 2
+
+
+def test_failures_and_empty_responses_are_not_cached():
+    with requests_mock.Mocker() as m:
+        m.get(f"{settings.OPEN_EPC_API_BASE_URL}/search", text="")
+        assert EPCApi().search_epc_details("22", "FL23 4JA") is None
+
+        m.get(f"{settings.OPEN_EPC_API_BASE_URL}/certificate/{lmk}", status_code=404)
+        with pytest.raises(requests.exceptions.HTTPError):
+            EPCApi().get_epc_details(lmk)
+
+        m.get(f"{settings.OPEN_EPC_API_BASE_URL}/search", json=load_test_reponse("sample_search_response.json"))
+        assert EPCApi().search_epc_details("22", "FL23 4JA")
+        m.get(f"{settings.OPEN_EPC_API_BASE_URL}/certificate/{lmk}", json=load_test_reponse("sample_epc_response.json"))
+        assert EPCApi().get_epc_details(lmk)
@@ -0,0 +1,57 @@
+import threading
+import unittest.mock
+
+import pytest
+
+from help_to_heat.frontdoor import interface
+from help_to_heat.frontdoor.os_api import ThrottledApiException
+
+
+class PagedOSApi:
+    total_results = 350
+    instances = 0
+
+    def __init__(self, key):
+        PagedOSApi.instances += 1
+        self.lock = threading.Lock()
+        self.offsets = []
+
+    def get_by_postcode(self, postcode, offset, max_results):
+        with self.lock:
+            self.offsets.append(offset)
+        number = min(max_results, self.total_results - offset)
+        results = [{"LPI": {"UPRN": str(offset + index)}} for index in range(number)]
+        return {"header": {"totalresults": self.total_results}, "results": results}
+
+
+class FailingPageOSApi(PagedOSApi):
+    def get_by_postcode(self, postcode, offset, max_results):
+        if offset == 200:
+            raise ThrottledApiException
+        return super().get_by_postcode(postcode, offset, max_results)
+
+
+class MissingPageOSApi(PagedOSApi):
+    def get_by_postcode(self, postcode, offset, max_results):
+        if offset == 100:
+            return []
+        return super().get_by_postcode(postcode, offset, max_results)
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.OSApi", PagedOSApi)
+def test_pages_are_merged_in_order():
+    PagedOSApi.instances = 0
+    results = interface.get_addresses_from_api("SW1A 2AA")
+    assert [result["LPI"]["UPRN"] for result in results] == [str(number) for number in range(350)]
+    assert PagedOSApi.instances == 1
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.OSApi", FailingPageOSApi)
+def test_a_failed_page_fails_the_lookup():
+    with pytest.raises(ThrottledApiException):
+        interface.get_addresses_from_api("SW1A 2AA")
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.OSApi", MissingPageOSApi)
+def test_a_missing_page_fails_the_lookup():
+    assert interface.get_addresses_from_api("SW1A 2AA") == []
@@ -0,0 +1,56 @@
+import socket
+import threading
+
+import pytest
+import requests
+import requests_mock
+from django.test import override_settings
+
+from help_to_heat.frontdoor import http_client
+
+
+def test_session_is_shared():
+    assert http_client.get_session() is http_client.get_session()
+
+
+def test_endpoints_have_their_own_adapters():
+    session = http_client.get_session()
+    os_adapter = session.get_adapter("https://api.os.uk/search/places/v1/uprn")
+    assert os_adapter is not session.get_adapter("https://example.com/")
+    assert os_adapter.max_retries.total == 2
+    assert 429 not in os_adapter.max_retries.status_forcelist
+
+
+def test_read_timeouts_are_not_retried():
+    # a server that accepts connections and never replies
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        server.settimeout(2)
+        connections = []
+        accept = threading.Thread(target=lambda: connections.append(server.accept()[0]))
+        accept.start()
+        session = requests.Session()
+        session.mount("http://", http_client._make_adapter(2))
+
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            session.get(f"http://127.0.0.1:{server.getsockname()[1]}/", timeout=0.2)
+        accept.join()
+        server.settimeout(0.5)
+        with pytest.raises(TimeoutError):
+            server.accept()
+        for connection in connections:
+            connection.close()
+
+
+@override_settings(OUTBOUND_HTTP_TIMEOUTS={"epc": 3, "os": 5})
+def test_get_uses_the_endpoint_timeout():
+    with requests_mock.Mocker() as m:
+        m.get("https://api.os.uk/search/places/v1/uprn", json={})
+        http_client.get("os", "https://api.os.uk/search/places/v1/uprn?uprn=1")
+        assert m.last_request.timeout == 5
+
+
+def test_cookies_are_not_kept():
+    with requests_mock.Mocker() as m:
+        m.get("https://api.os.uk/search/places/v1/uprn", json={}, headers={"Set-Cookie": "session=abc; Path=/"})
+        http_client.get("os", "https://api.os.uk/search/places/v1/uprn?uprn=1")
+    assert not http_client.get_session().cookies
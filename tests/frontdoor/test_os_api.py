@@ -1,4 +1,17 @@
-from help_to_heat.frontdoor.os_api import OSApi
+from http import HTTPStatus
+
+import pytest
+import requests
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from help_to_heat.frontdoor.os_api import (
+    KeyScheduler,
+    OSApi,
+    ThrottledApiException,
+    _KeyUsage,
+)
 
 
 def test_os_api_init():
@@ -28,3 +41,126 @@ def test_os_api_no_result():
     api_client = MockClient('["key"]')
     response = api_client.get_by_postcode("postcode with no addresses", 0, 100)
     assert response == mock_response
+
+
+def test_os_api_get_by_uprn_moves_on_to_the_next_key():
+    keys_used = []
+
+    class MockClient(OSApi):
+        def perform_request(self, url):
+            keys_used.append(url.rsplit("key=", 1)[1])
+            if len(keys_used) == 1:
+                response = requests.Response()
+                response.status_code = HTTPStatus.TOO_MANY_REQUESTS
+                raise requests.exceptions.HTTPError(response=response)
+            return "mock response"
+
+    api_client = MockClient('["key1", "key2"]')
+    assert api_client.get_by_uprn(10, dataset="LPI") == "mock response"
+    assert keys_used == ["key1", "key2"]
+
+
+def test_os_api_get_by_uprn_throttled():
+    class MockClient(OSApi):
+        def perform_request(self, url):
+            response = requests.Response()
+            response.status_code = HTTPStatus.TOO_MANY_REQUESTS
+            raise requests.exceptions.HTTPError(response=response)
+
+    api_client = MockClient('["key1", "key2"]')
+    with pytest.raises(ThrottledApiException):
+        api_client.get_by_uprn(10, dataset="LPI")
+
+
+def _throttled():
+    response = requests.Response()
+    response.status_code = HTTPStatus.TOO_MANY_REQUESTS
+    return requests.exceptions.HTTPError(response=response)
+
+
+def test_os_api_spreads_requests_across_keys():
+    keys_used = []
+
+    class MockClient(OSApi):
+        def perform_request(self, url):
+            keys_used.append(url.rsplit("key=", 1)[1])
+            return "mock response"
+
+    for _ in range(4):
+        MockClient('["key1", "key2"]').get_by_uprn(10, dataset="LPI")
+    assert sorted(keys_used) == ["key1", "key1", "key2", "key2"]
+    assert [usage["uses_today"] for usage in KeyScheduler(["key1", "key2"]).get_usage()] == [2, 2]
+
+
+def test_os_api_skips_throttled_keys():
+    keys_used = []
+
+    class MockClient(OSApi):
+        def perform_request(self, url):
+            key = url.rsplit("key=", 1)[1]
+            keys_used.append(key)
+            if key == "key1":
+                raise _throttled()
+            return "mock response"
+
+    MockClient('["key1", "key2"]').get_by_uprn(10, dataset="LPI")
+    assert keys_used == ["key1", "key2"]
+
+    # later requests skip the throttled key straight away
+    keys_used.clear()
+    for _ in range(3):
+        MockClient('["key1", "key2"]').get_by_postcode("w1a 1aa", 0, 100)
+    assert keys_used == ["key2", "key2", "key2"]
+    assert [usage["cooling_down"] for usage in KeyScheduler(["key1", "key2"]).get_usage()] == [True, False]
+
+
+def test_os_api_fails_fast_when_every_key_is_throttled():
+    requests_made = []
+
+    class MockClient(OSApi):
+        def perform_request(self, url):
+            requests_made.append(url)
+            raise _throttled()
+
+    with pytest.raises(ThrottledApiException):
+        MockClient('["key1", "key2"]').get_by_postcode("w1a 1aa", 0, 100)
+    assert len(requests_made) == 2
+
+    with pytest.raises(ThrottledApiException):
+        MockClient('["key1", "key2"]').get_by_postcode("w1a 1aa", 0, 100)
+    assert len(requests_made) == 2
+
+
+def test_key_scheduler_only_queries_the_cache_when_syncing():
+    class MockClient(OSApi):
+        def perform_request(self, url):
+            return "mock response"
+
+    MockClient('["key1", "key2"]').get_by_uprn(10, dataset="LPI")
+    with CaptureQueriesContext(connections["cache"]) as queries:
+        for _ in range(5):
+            MockClient('["key1", "key2"]').get_by_uprn(10, dataset="LPI")
+    assert len(queries) == 0
+
+    # syncing adds the uses counted in this worker to the shared cache
+    assert [usage["uses_today"] for usage in KeyScheduler(["key1", "key2"]).get_usage()] == [3, 3]
+    other_worker = KeyScheduler(["key1", "key2"])
+    other_worker.usage = _KeyUsage()
+    assert [usage["uses_today"] for usage in other_worker.get_usage()] == [3, 3]
+
+
+@override_settings(OS_API_KEY_USAGE_SYNC_SECONDS=0)
+def test_key_scheduler_sees_other_workers_cooldowns_once_synced():
+    keys_used = []
+
+    class MockClient(OSApi):
+        def perform_request(self, url):
+            keys_used.append(url.rsplit("key=", 1)[1])
+            return "mock response"
+
+    other_worker = KeyScheduler(["key1", "key2"])
+    other_worker.usage = _KeyUsage()
+    other_worker.record_throttled(0)
+
+    MockClient('["key1", "key2"]').get_by_uprn(10, dataset="LPI")
+    assert keys_used == ["key2"]
@@ -0,0 +1,65 @@
+import pytest
+
+from help_to_heat.frontdoor.consts import (
+    country_field,
+    country_field_england,
+    country_field_northern_ireland,
+    country_page,
+    govuk_start_page,
+    northern_ireland_ineligible_page,
+    own_property_field,
+    own_property_field_own_property,
+    own_property_page,
+    supplier_field,
+    supplier_field_british_gas,
+    supplier_page,
+)
+from help_to_heat.frontdoor.routing import (
+    CouldNotCalculateJourneyException,
+    calculate_journey,
+    clear_journey_cache,
+    journey_cache_info,
+)
+
+answers = {
+    country_field: country_field_england,
+    supplier_field: supplier_field_british_gas,
+    own_property_field: own_property_field_own_property,
+}
+
+
+@pytest.fixture(autouse=True)
+def empty_journey_cache():
+    clear_journey_cache()
+    yield
+    clear_journey_cache()
+
+
+def test_repeated_journeys_are_cached():
+    expected = [govuk_start_page, country_page, supplier_page, own_property_page]
+    assert calculate_journey(answers, own_property_page) == expected
+    assert calculate_journey(answers, own_property_page) == expected
+    assert journey_cache_info() == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_answers_routing_does_not_read_share_a_journey():
+    calculate_journey(answers, supplier_page)
+    calculate_journey({**answers, own_property_field: "something else", "first_name": "Flooble"}, supplier_page)
+    assert journey_cache_info()["hits"] == 1
+
+
+def test_answers_routing_reads_are_part_of_the_key():
+    calculate_journey(answers, supplier_page)
+    northern_ireland_answers = {**answers, country_field: country_field_northern_ireland}
+    result = calculate_journey(northern_ireland_answers, northern_ireland_ineligible_page)
+    assert result == [govuk_start_page, country_page, northern_ireland_ineligible_page]
+
+    with pytest.raises(CouldNotCalculateJourneyException):
+        calculate_journey(northern_ireland_answers, supplier_page)
+    assert journey_cache_info()["hits"] == 0
+
+
+def test_cached_journeys_cannot_be_modified_by_callers():
+    journey = calculate_journey(answers, supplier_page)
+    journey.append("flibble")
+    assert calculate_journey(answers, supplier_page) == [govuk_start_page, country_page, supplier_page]
@@ -0,0 +1,78 @@
+import random
+
+from help_to_heat.frontdoor import consts
+from help_to_heat.frontdoor.consts import (
+    country_page,
+    govuk_start_page,
+    northern_ireland_ineligible_page,
+    own_property_page,
+    supplier_page,
+    unknown_page,
+)
+from help_to_heat.frontdoor.routing import (
+    calculate_journey,
+    max_journey_length,
+)
+from help_to_heat.frontdoor.routing.backwards_routing import get_prev_page
+from help_to_heat.frontdoor.routing.forwards_routing import (
+    get_next_page,
+    next_page_rules,
+)
+from help_to_heat.frontdoor.routing.routing_graph import (
+    RoutingGraph,
+    routing_graph,
+    verify_routing_graph,
+)
+
+# every answer field, and every value any of them can take
+answer_fields = tuple(value for name, value in vars(consts).items() if name.endswith("_field"))
+answer_values = tuple(value for name, value in vars(consts).items() if "_field_" in name and isinstance(value, str)) + (
+    None,
+)
+
+
+def test_routing_graph_is_valid():
+    verify_routing_graph(routing_graph, max_journey_length)
+
+
+def test_rules_only_lead_to_their_next_pages():
+    randomiser = random.Random(1234)
+    for page, next_pages in routing_graph.successors.items():
+        for _ in range(500):
+            answers = {field: randomiser.choice(answer_values) for field in answer_fields}
+            next_page = get_next_page(page, answers)
+            assert next_page in next_pages + (unknown_page,), (page, next_page)
+
+
+def test_predecessors():
+    assert routing_graph.predecessors[country_page] == (govuk_start_page,)
+    assert routing_graph.get_only_predecessor(northern_ireland_ineligible_page) == country_page
+    assert set(routing_graph.predecessors[own_property_page]) == {
+        consts.supplier_page,
+        consts.alternative_supplier_page,
+        consts.bulb_warning_page,
+        consts.shell_warning_page,
+        consts.utility_warehouse_warning_page,
+    }
+    assert routing_graph.get_only_predecessor(own_property_page) is None
+
+
+def test_prev_page_matches_journey():
+    answers = {
+        consts.country_field: consts.country_field_england,
+        consts.supplier_field: consts.supplier_field_bulb,
+        consts.bulb_warning_page_field: consts.field_yes,
+    }
+    for page in (supplier_page, consts.bulb_warning_page, own_property_page):
+        journey = calculate_journey(answers, page)
+        assert get_prev_page(page, answers) == journey[-2]
+
+
+def test_cycles_are_found():
+    rules = {
+        **next_page_rules,
+        consts.summary_page: (None, (consts.loft_page,)),
+    }
+    cycle = RoutingGraph(rules).find_cycle()
+    assert cycle[0] == cycle[-1]
+    assert consts.summary_page in cycle
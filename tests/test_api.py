@@ -29,3 +29,6 @@ def test_healthcheck():
     result = client.get("/api/healthcheck/")
     assert result.json()["healthy"] is True
     assert result.json()["datetime"]
+    assert result.json()["circuit_breakers"] == {}
+    assert result.json()["caches"]["postcode_addresses"] == {"local_hits": 0, "shared_hits": 0, "misses": 0}
+    assert set(result.json()["caches"]["journeys"]) == {"hits", "misses", "size"}
@@ -0,0 +1,136 @@
+import json
+import uuid
+from datetime import timedelta
+
+import pytest
+from django.core.cache import caches
+from django.core.management import call_command
+from django.utils import timezone
+
+from help_to_heat import portal
+from help_to_heat.frontdoor import compaction, interface, models
+
+from . import utils
+
+
+@pytest.fixture(autouse=True)
+def reset_checkpoints():
+    # so each test starts from a run that hasn't happened yet
+    models.CompactionCheckpoint.objects.all().delete()
+    yield
+
+
+def _save_answer(session_id, page_name, data, days_ago):
+    interface.api.session.save_answer(session_id=session_id, page_name=page_name, data=data)
+    answer = models.Answer.objects.filter(session_id=session_id).latest("created_at")
+    models.Answer.objects.filter(id=answer.id).update(created_at=timezone.now() - timedelta(days=days_ago))
+
+
+def test_superseded_answers_are_removed_from_stale_sessions():
+    session_id = uuid.uuid4()
+    _save_answer(session_id, "country", {"country": "England"}, days_ago=5)
+    _save_answer(session_id, "supplier", {"supplier": "Utilita"}, days_ago=5)
+    _save_answer(session_id, "country", {"country": "Wales"}, days_ago=4)
+    _save_answer(session_id, "supplier", {"supplier": "Octopus Energy"}, days_ago=4)
+    _save_answer(session_id, "country", {"country": "Scotland"}, days_ago=3)
+
+    page_answers_before = {
+        page_name: interface.api.session.get_page_answers(session_id=session_id, page_name=page_name)
+        for page_name in ("country", "supplier")
+    }
+
+    call_command("compact_answers")
+
+    assert models.Answer.objects.filter(session_id=session_id).count() == 2
+    for page_name, expected in page_answers_before.items():
+        result = interface.api.session.get_page_answers(session_id=session_id, page_name=page_name)
+        assert result == expected, (result, expected)
+
+
+def test_recent_sessions_are_left_alone():
+    session_id = uuid.uuid4()
+    _save_answer(session_id, "country", {"country": "England"}, days_ago=0)
+    _save_answer(session_id, "country", {"country": "Wales"}, days_ago=0)
+
+    call_command("compact_answers")
+
+    assert models.Answer.objects.filter(session_id=session_id).count() == 2
+
+
+def test_abandoned_sessions_are_archived_and_deleted(tmp_path):
+    abandoned_session_id = uuid.uuid4()
+    _save_answer(abandoned_session_id, "country", {"country": "England"}, days_ago=100)
+    referred_session_id = uuid.uuid4()
+    _save_answer(referred_session_id, "country", {"country": "England"}, days_ago=100)
+    utils.create_referral(session_id=referred_session_id)
+
+    archive_path = tmp_path / "archive.jsonl"
+    call_command("compact_answers", "--archive", str(archive_path))
+
+    assert not models.Answer.objects.filter(session_id=abandoned_session_id).exists()
+    assert not models.SessionSnapshot.objects.filter(session_id=abandoned_session_id).exists()
+    assert models.Answer.objects.filter(session_id=referred_session_id).exists()
+    assert portal.models.Referral.objects.filter(session_id=referred_session_id).exists()
+
+    archived = [json.loads(line) for line in archive_path.read_text().splitlines()]
+    assert [(line["session_id"], line["data"]) for line in archived] == [
+        (str(abandoned_session_id), {"country": "England"})
+    ]
+
+
+def test_compaction_pages_through_sessions():
+    session_ids = [uuid.uuid4() for _ in range(3)]
+    for session_id in session_ids:
+        _save_answer(session_id, "country", {"country": "England"}, days_ago=5)
+        _save_answer(session_id, "country", {"country": "Wales"}, days_ago=4)
+
+    call_command("compact_answers", "--batch-size", "2")
+
+    for session_id in session_ids:
+        assert models.Answer.objects.filter(session_id=session_id).count() == 1
+
+
+def test_compaction_only_scans_answers_since_the_last_run():
+    call_command("compact_answers", "--stale-days", "3")
+
+    # quiet since before the last run, so it was already compacted then
+    checked_session_id = uuid.uuid4()
+    _save_answer(checked_session_id, "country", {"country": "England"}, days_ago=5)
+    _save_answer(checked_session_id, "country", {"country": "Wales"}, days_ago=4)
+    # answered since the last run
+    session_id = uuid.uuid4()
+    _save_answer(session_id, "country", {"country": "England"}, days_ago=2)
+    _save_answer(session_id, "country", {"country": "Wales"}, days_ago=1)
+
+    call_command("compact_answers", "--stale-days", "0")
+
+    assert models.Answer.objects.filter(session_id=checked_session_id).count() == 2
+    assert models.Answer.objects.filter(session_id=session_id).count() == 1
+
+
+def test_compaction_checkpoint_survives_the_cache_being_cleared():
+    call_command("compact_answers", "--stale-days", "3")
+    checked_before = models.CompactionCheckpoint.objects.get(name="superseded-answers").checked_before
+    caches["shared"].clear()
+
+    call_command("compact_answers", "--stale-days", "3", "--dry-run")
+
+    assert models.CompactionCheckpoint.objects.get(name="superseded-answers").checked_before == checked_before
+
+
+def test_sessions_returned_to_during_the_run_are_left_alone(monkeypatch):
+    session_id = uuid.uuid4()
+    _save_answer(session_id, "country", {"country": "England"}, days_ago=100)
+    page_session_ids = compaction._page_session_ids
+
+    def _page_session_ids_then_come_back(answers, batch_size):
+        for session_id_batch in page_session_ids(answers, batch_size):
+            # the user comes back after the session was found, but before it's deleted
+            interface.api.session.save_answer(session_id=session_id, page_name="country", data={"country": "Wales"})
+            yield session_id_batch
+
+    monkeypatch.setattr(compaction, "_page_session_ids", _page_session_ids_then_come_back)
+    compaction.delete_abandoned_sessions(timezone.now() - timedelta(days=90), 500, compaction.CompactionReport())
+
+    assert models.Answer.objects.filter(session_id=session_id).count() == 2
+    assert models.SessionSnapshot.objects.filter(session_id=session_id).exists()
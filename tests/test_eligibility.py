@@ -25,7 +25,7 @@ eligible_council_tax = {
 
 def _add_epc():
     assert interface.api.epc.get_address_and_epc_lmk("22", "FL23 4JA")
-    assert interface.api.epc.get_epc("2222-2222-2222-2222-2222")
+    assert interface.api.epc.get_epc_details("2222-2222-2222-2222-2222")
 
 
 def _make_check_page(session_id):
@@ -90,7 +90,7 @@ def _do_test(country, council_tax_band, epc_rating):
 
     page = form.submit().follow()
 
-    data = interface.api.session.get_answer(session_id, page_name="epc-select")
+    data = interface.api.session.get_page_answers(session_id, page_name="epc-select")
     assert data["lmk"] == "222222222222222222222222222222222"
     assert data["address"] == "22 Acacia Avenue, Upper Wellgood, Fulchester, FL23 4JA"
 
@@ -0,0 +1,120 @@
+import csv
+import unittest.mock
+import zipfile
+
+import pytest
+import requests
+from django.test import override_settings
+
+from help_to_heat import portal
+from help_to_heat.frontdoor import interface
+from help_to_heat.frontdoor.mock_epc_api import MockEPCApi
+from help_to_heat.portal import epc_writer
+
+fieldnames = ("LMK_KEY", "ADDRESS1", "ADDRESS2", "ADDRESS3", "POSTCODE", "POSTTOWN", "UPRN", "LODGEMENT_DATE")
+
+rows = (
+    ("lmk-1", "22 Acacia Avenue", "Upper Wellgood", "", "FL23 4JA", "Fulchester", "100000000022", "2015-01-02"),
+    ("lmk-2", "22 Acacia Avenue", "Upper Wellgood", "", "FL23 4JA", "Fulchester", "100000000022", "2020-03-04"),
+    ("lmk-3", "Flat 1", "23 Acacia Avenue", "", "FL23 4JA", "Fulchester", "100000000023", "2021-05-06"),
+    ("lmk-4", "10 Downing Street", "", "", "SW1A 2AA", "London", "", "2019-07-08"),
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_certificates():
+    yield
+    portal.models.EpcCertificate.objects.all().delete()
+
+
+def _write_csv(path, rows):
+    with path.open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows(rows)
+
+
+def test_load_from_directory(tmp_path):
+    (tmp_path / "domestic-E01").mkdir()
+    (tmp_path / "domestic-E02").mkdir()
+    _write_csv(tmp_path / "domestic-E01" / "certificates.csv", rows[:2])
+    _write_csv(tmp_path / "domestic-E02" / "certificates.csv", rows[2:])
+
+    epc_writer.write_certificates(epc_writer.read_certificate_rows(tmp_path), batch_size=3)
+
+    assert portal.models.EpcCertificate.objects.count() == 4
+    certificate = portal.models.EpcCertificate.objects.get(lmk_key="lmk-3")
+    assert certificate.normalised_postcode == "FL234JA"
+    assert str(certificate.lodgement_date) == "2021-05-06"
+
+
+def test_reload_from_zip_updates_certificates(tmp_path):
+    _write_csv(tmp_path / "certificates.csv", rows)
+    epc_writer.write_certificates(epc_writer.read_certificate_rows(tmp_path / "certificates.csv"))
+
+    updated_rows = [("lmk-4", "11 Downing Street", "", "", "SW1A 2AA", "London", "", "2019-07-08")]
+    _write_csv(tmp_path / "certificates.csv", updated_rows)
+    with zipfile.ZipFile(tmp_path / "all-domestic-certificates.zip", "w") as archive:
+        archive.write(tmp_path / "certificates.csv", "domestic-E09000033-Westminster/certificates.csv")
+    epc_writer.write_certificates(epc_writer.read_certificate_rows(tmp_path / "all-domestic-certificates.zip"))
+
+    assert portal.models.EpcCertificate.objects.count() == 4
+    assert portal.models.EpcCertificate.objects.get(lmk_key="lmk-4").address1 == "11 Downing Street"
+
+
+class UnavailableEPCApi(MockEPCApi):
+    def search_epc_details(self, building, postcode):
+        raise AssertionError("The Open EPC API shouldn't be searched")
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.EPCApi", UnavailableEPCApi)
+def test_search_uses_local_certificates(tmp_path):
+    _write_csv(tmp_path / "certificates.csv", rows)
+    epc_writer.write_certificates(epc_writer.read_certificate_rows(tmp_path / "certificates.csv"))
+
+    results = interface.api.epc.get_address_and_epc_lmk("22", "fl23 4ja")
+    assert [result["lmk-key"] for result in results] == ["lmk-1", "lmk-2"]
+    assert results[1] == {
+        "lmk-key": "lmk-2",
+        "address": "22 Acacia Avenue, Upper Wellgood",
+        "address1": "22 Acacia Avenue",
+        "address2": "Upper Wellgood",
+        "address3": "",
+        "posttown": "Fulchester",
+        "postcode": "FL23 4JA",
+        "uprn": "100000000022",
+        "lodgement-date": "2020-03-04",
+    }
+
+    assert [result["lmk-key"] for result in interface.api.epc.get_address_and_epc_lmk("23", "FL23 4JA")] == ["lmk-3"]
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.EPCApi", MockEPCApi)
+def test_search_falls_back_to_the_api():
+    results = interface.api.epc.get_address_and_epc_lmk("22", "FL23 4JA")
+    assert results[0]["lmk-key"] == "1111111111111111111111111111111111"
+
+
+@override_settings(EPC_LOCAL_CERTIFICATES_TTL=0)
+@unittest.mock.patch("help_to_heat.frontdoor.interface.EPCApi", MockEPCApi)
+def test_search_checks_the_api_when_local_certificates_are_stale(tmp_path):
+    _write_csv(tmp_path / "certificates.csv", rows)
+    epc_writer.write_certificates(epc_writer.read_certificate_rows(tmp_path / "certificates.csv"))
+
+    results = interface.api.epc.get_address_and_epc_lmk("22", "FL23 4JA")
+    assert results[0]["lmk-key"] == "1111111111111111111111111111111111"
+
+
+class FailingEPCApi(MockEPCApi):
+    def search_epc_details(self, building, postcode):
+        raise requests.exceptions.ConnectionError("Connection refused")
+
+
+@override_settings(EPC_LOCAL_CERTIFICATES_TTL=0)
+@unittest.mock.patch("help_to_heat.frontdoor.interface.EPCApi", FailingEPCApi)
+def test_search_uses_stale_local_certificates_when_the_api_fails(tmp_path):
+    _write_csv(tmp_path / "certificates.csv", rows)
+    epc_writer.write_certificates(epc_writer.read_certificate_rows(tmp_path / "certificates.csv"))
+
+    results = interface.api.epc.get_address_and_epc_lmk("22", "FL23 4JA")
+    assert [result["lmk-key"] for result in results] == ["lmk-1", "lmk-2"]
@@ -0,0 +1,233 @@
+import bz2
+
+import pytest
+from django.test import override_settings
+
+from help_to_heat import portal
+from help_to_heat.portal import epc_writer
+
+
+@pytest.fixture(autouse=True)
+def reset_epc_ratings():
+    portal.models.EpcRating.objects.all().delete()
+    portal.models.EpcLoadRun.objects.all().delete()
+    yield
+    portal.models.EpcRating.objects.all().delete()
+    portal.models.EpcLoadRun.objects.all().delete()
+
+
+sorted_url = "https://example.com/epc-ratings-sorted.csv.bz2"
+
+
+def test_write_rows():
+    rows = [
+        {"uprn": "100000000001", "epc_rating": "D", "date": "2015-01-02"},
+        {"uprn": "100000000002", "epc_rating": "E", "date": "2016-01-02"},
+        {"uprn": "100000000001", "epc_rating": "C", "date": "2020-01-02"},
+        {"uprn": "100000000003", "epc_rating": "B", "date": "2017-01-02"},
+    ]
+    run = epc_writer.start_load_run(sorted_url)
+    epc_writer.write_rows(rows, run, batch_size=3)
+
+    ratings = {rating.uprn: (rating.rating, str(rating.date)) for rating in portal.models.EpcRating.objects.all()}
+    assert ratings == {
+        "100000000001": ("C", "2020-01-02"),
+        "100000000002": ("E", "2016-01-02"),
+        "100000000003": ("B", "2017-01-02"),
+    }
+    run.refresh_from_db()
+    assert (run.status, run.rows_read, run.rows_written, run.batches_committed) == ("completed", 4, 4, 2)
+    assert run.finished_at
+
+
+def test_write_rows_with_blank_rating():
+    rows = [
+        {"uprn": "100000000001", "epc_rating": "", "date": "2015-01-02"},
+        {"uprn": "100000000002", "epc_rating": "E", "date": "2016-01-02"},
+    ]
+    run = epc_writer.start_load_run(sorted_url)
+    epc_writer.write_rows(rows, run)
+
+    ratings = {rating.uprn: rating.rating for rating in portal.models.EpcRating.objects.all()}
+    assert ratings == {"100000000001": "", "100000000002": "E"}
+
+
+def test_write_rows_loads_from_latest_date():
+    run = epc_writer.start_load_run(sorted_url)
+    epc_writer.write_rows([{"uprn": "100000000001", "epc_rating": "D", "date": "2020-01-02"}], run)
+
+    rows = [
+        {"uprn": "100000000001", "epc_rating": "G", "date": "2019-01-02"},
+        {"uprn": "100000000002", "epc_rating": "E", "date": "2020-01-02"},
+        {"uprn": "100000000001", "epc_rating": "A", "date": "2021-01-02"},
+    ]
+    run = epc_writer.start_load_run(sorted_url)
+    epc_writer.write_rows(rows, run)
+    assert (run.rows_read, run.rows_written) == (3, 2)
+
+    ratings = {rating.uprn: (rating.rating, str(rating.date)) for rating in portal.models.EpcRating.objects.all()}
+    assert ratings == {"100000000001": ("A", "2021-01-02"), "100000000002": ("E", "2020-01-02")}
+    created_at, modified_at = portal.models.EpcRating.objects.values_list("created_at", "modified_at").get(
+        uprn="100000000001"
+    )
+    assert modified_at > created_at
+
+
+@pytest.mark.parametrize("trailing_newline", [True, False])
+def test_sort_lines_matches_sorting_in_memory(tmp_path, monkeypatch, trailing_newline):
+    monkeypatch.setattr(epc_writer, "DATA_DIR", tmp_path)
+    lines = [f"{(i * 7919) % 1000:012d},{'ABCDEFG'[i % 7]},2020-01-{i % 28 + 1:02d}\n" for i in range(1000)]
+    lines[-1] = lines[-1] if trailing_newline else lines[-1].rstrip("\n")
+    filepath = tmp_path / "ratings.csv"
+    filepath.write_text("uprn,epc_rating,date\n" + "".join(lines))
+
+    sorted_filepath = tmp_path / "ratings-sorted.csv"
+    epc_writer.sort_lines(filepath, sorted_filepath, memory_budget=2000)
+
+    with filepath.open("r") as f:
+        expected_lines = f.readlines()
+    expected = expected_lines[0] + "".join(sorted(expected_lines[1:]))
+    assert sorted_filepath.read_text() == expected
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["ratings-sorted.csv", "ratings.csv"]
+
+
+class FakeStreamResponse:
+    def __init__(self, content, chunk_size):
+        self.content = content
+        self.chunk_size = chunk_size
+        self.headers = {"content-length": str(len(content))}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_bytes(self, chunk_size):
+        for start in range(0, len(self.content), self.chunk_size):
+            yield self.content[start : start + self.chunk_size]
+
+
+def _compress_ratings(rows):
+    text = "uprn,epc_rating,date\n" + "".join(f"{uprn},{rating},{date}\n" for uprn, rating, date in rows)
+    return bz2.compress(text.encode("utf-8"))
+
+
+stream_url = "https://example.com/epc-ratings.csv.bz2"
+
+
+def test_stream_url_to_database_keeps_latest_rating(tmp_path, monkeypatch):
+    monkeypatch.setattr(epc_writer, "DATA_DIR", tmp_path)
+    content = _compress_ratings(
+        [
+            ("100000000001", "C", "2020-01-02"),
+            ("100000000002", "E", "2016-01-02"),
+            ("100000000001", "D", "2015-01-02"),
+            ("100000000003", "B", "2017-01-02"),
+            ("100000000002", "F", "2014-01-02"),
+        ]
+    )
+    monkeypatch.setattr(epc_writer.httpx, "stream", lambda method, url: FakeStreamResponse(content, chunk_size=7))
+
+    epc_writer.stream_url_to_database(stream_url, batch_size=2)
+
+    ratings = {rating.uprn: (rating.rating, str(rating.date)) for rating in portal.models.EpcRating.objects.all()}
+    assert ratings == {
+        "100000000001": ("C", "2020-01-02"),
+        "100000000002": ("E", "2016-01-02"),
+        "100000000003": ("B", "2017-01-02"),
+    }
+    assert list(tmp_path.iterdir()) == []
+    assert not portal.models.EpcLoadRun.objects.exclude(status="completed").exists()
+
+
+def test_stream_url_to_database_resumes_after_last_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(epc_writer, "DATA_DIR", tmp_path)
+    rows = [(f"1000000000{i:02d}", "ABCDEFG"[i % 7], f"2020-01-{i % 28 + 1:02d}") for i in range(50)]
+    content = _compress_ratings(rows)
+
+    monkeypatch.setattr(epc_writer.httpx, "stream", lambda method, url: FakeStreamResponse(content, chunk_size=16))
+    upsert_epc_ratings = epc_writer._upsert_epc_ratings
+    calls = []
+
+    def _failing_upsert_epc_ratings(batch, keep_latest):
+        calls.append(batch)
+        if len(calls) > 3:
+            raise ConnectionError("Connection lost")
+        upsert_epc_ratings(batch, keep_latest)
+
+    monkeypatch.setattr(epc_writer, "_upsert_epc_ratings", _failing_upsert_epc_ratings)
+    with pytest.raises(ConnectionError):
+        epc_writer.stream_url_to_database(stream_url, batch_size=7)
+    run = portal.models.EpcLoadRun.objects.get()
+    assert (run.status, run.rows_read, run.batches_committed) == ("failed", 21, 3)
+    assert run.error == "Connection lost"
+    assert portal.models.EpcRating.objects.count() == 21
+
+    loaded_rows = []
+    monkeypatch.setattr(epc_writer, "_upsert_epc_ratings", lambda batch, keep_latest: loaded_rows.extend(batch))
+    epc_writer.stream_url_to_database(stream_url, batch_size=10)
+
+    assert [row["uprn"] for row in loaded_rows] == [uprn for uprn, _, _ in rows[21:]]
+    run.refresh_from_db()
+    assert (run.status, run.rows_read, run.batches_committed) == ("completed", 50, 6)
+    assert run.bytes_read == run.total_bytes == len(content)
+
+
+def test_start_load_run_refuses_url_already_loading():
+    run = epc_writer.start_load_run(sorted_url)
+
+    with pytest.raises(epc_writer.LoadRunInProgressException):
+        epc_writer.start_load_run(sorted_url)
+    assert portal.models.EpcLoadRun.objects.get() == run
+
+
+def test_start_load_run_resumes_stale_run():
+    run = epc_writer.start_load_run(sorted_url)
+    epc_writer.write_rows([{"uprn": "100000000001", "epc_rating": "D", "date": "2020-01-02"}], run)
+    run.status = "running"
+    run.save()
+
+    with override_settings(EPC_LOAD_RUN_STALE_SECONDS=0):
+        assert epc_writer.mark_stale_load_runs() == 1
+    run.refresh_from_db()
+    assert (run.status, run.error) == ("failed", "Stopped without finishing")
+
+    resumed_run = epc_writer.start_load_run(sorted_url)
+    assert (resumed_run.id, resumed_run.status, resumed_run.rows_read) == (run.id, "running", 1)
+
+
+def test_write_rows_stops_if_run_loaded_by_another_process():
+    run = epc_writer.start_load_run(sorted_url)
+    portal.models.EpcLoadRun.objects.filter(id=run.id).update(rows_read=5)
+
+    with pytest.raises(epc_writer.LoadRunInProgressException):
+        epc_writer.write_rows([{"uprn": "100000000001", "epc_rating": "D", "date": "2020-01-02"}], run)
+    assert not portal.models.EpcRating.objects.exists()
+    run.refresh_from_db()
+    assert (run.status, run.rows_read) == ("running", 5)
+
+
+def test_load_url_to_database_is_in_progress_while_downloading(tmp_path, monkeypatch):
+    monkeypatch.setattr(epc_writer, "DATA_DIR", tmp_path)
+    rows = [("100000000001", "D", "2015-01-02"), ("100000000002", "E", "2016-01-02")]
+    content = _compress_ratings(rows)
+    statuses_while_downloading = []
+
+    class CheckingStreamResponse(FakeStreamResponse):
+        def iter_bytes(self, chunk_size):
+            statuses_while_downloading.extend(portal.models.EpcLoadRun.objects.values_list("status", flat=True))
+            with pytest.raises(epc_writer.LoadRunInProgressException):
+                epc_writer.start_load_run(sorted_url)
+            yield from super().iter_bytes(chunk_size)
+
+    monkeypatch.setattr(epc_writer.httpx, "stream", lambda method, url: CheckingStreamResponse(content, chunk_size=16))
+    epc_writer.load_url_to_database(sorted_url)
+
+    assert statuses_while_downloading == ["downloading"]
+    run = portal.models.EpcLoadRun.objects.get()
+    assert (run.status, run.rows_read, run.rows_written) == ("completed", 2, 2)
+    assert portal.models.EpcRating.objects.count() == 2
@@ -164,7 +164,7 @@ def _answer_house_questions(
     form["lmk"] = "222222222222222222222222222222222"
     page = form.submit().follow()
 
-    data = interface.api.session.get_answer(session_id, page_name="epc-select")
+    data = interface.api.session.get_page_answers(session_id, page_name="epc-select")
     assert data["lmk"] == "222222222222222222222222222222222"
     assert data["address"] == "22 Acacia Avenue, Upper Wellgood, Fulchester, FL23 4JA"
 
@@ -463,7 +463,7 @@ def test_no_benefits_flow():
     form["lmk"] = "222222222222222222222222222222222"
     page = form.submit().follow()
 
-    data = interface.api.session.get_answer(session_id, page_name="epc-select")
+    data = interface.api.session.get_page_answers(session_id, page_name="epc-select")
     assert data["lmk"] == "222222222222222222222222222222222"
     assert data["address"] == "22 Acacia Avenue, Upper Wellgood, Fulchester, FL23 4JA"
 
@@ -754,7 +754,7 @@ def test_eligibility():
     form["lmk"] = "222222222222222222222222222222222"
     page = form.submit().follow()
 
-    data = interface.api.session.get_answer(session_id, page_name="epc-select")
+    data = interface.api.session.get_page_answers(session_id, page_name="epc-select")
     assert data["lmk"] == "222222222222222222222222222222222"
     assert data["address"] == "22 Acacia Avenue, Upper Wellgood, Fulchester, FL23 4JA"
 
@@ -1304,7 +1304,7 @@ def test_on_check_page_back_button_goes_to_correct_location(has_loft_insulation)
     form["lmk"] = "222222222222222222222222222222222"
     page = form.submit().follow()
 
-    data = interface.api.session.get_answer(session_id, page_name="epc-select")
+    data = interface.api.session.get_page_answers(session_id, page_name="epc-select")
     assert data["lmk"] == "222222222222222222222222222222222"
     assert data["address"] == "22 Acacia Avenue, Upper Wellgood, Fulchester, FL23 4JA"
 
@@ -1718,7 +1718,7 @@ def test_epc_page_shows_epc_info():
     form["lmk"] = "222222222222222222222222222222222"
     page = form.submit().follow()
 
-    data = interface.api.session.get_answer(session_id, page_name="epc-select")
+    data = interface.api.session.get_page_answers(session_id, page_name="epc-select")
     assert data["lmk"] == "222222222222222222222222222222222"
     assert data["address"] == "22 Acacia Avenue, Upper Wellgood, Fulchester, FL23 4JA"
 
@@ -1831,7 +1831,7 @@ def _get_empty_recommendations_journey():
     form[lmk_field] = "222222222222222222222222222222222"
     page = form.submit().follow()
 
-    data = interface.api.session.get_answer(session_id, page_name="epc-select")
+    data = interface.api.session.get_page_answers(session_id, page_name="epc-select")
     assert data[recommendations_field] == []
 
     assert page.has_one("h1:contains('What is the council tax band of your property?')")
@@ -2062,7 +2062,7 @@ def test_accept_epc_page_assumes_answer_is_yes():
     form["lmk"] = "222222222222222222222222222222222"
     page = form.submit().follow()
 
-    data = interface.api.session.get_answer(session_id, page_name="epc-select")
+    data = interface.api.session.get_page_answers(session_id, page_name="epc-select")
     assert data["lmk"] == "222222222222222222222222222222222"
     assert data["address"] == "22 Acacia Avenue, Upper Wellgood, Fulchester, FL23 4JA"
 
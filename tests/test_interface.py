@@ -1,10 +1,22 @@
+import threading
+import time
 import unittest
 import uuid
 from http import HTTPStatus
 
 import requests
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 
-from help_to_heat.frontdoor import interface
+from help_to_heat import portal
+from help_to_heat import utils as utils_module
+from help_to_heat.frontdoor import (
+    interface,
+    models,
+    session_cache,
+    session_stores,
+)
 from help_to_heat.frontdoor.mock_epc_api import (
     MockEPCApi,
     MockNotFoundEPCApi,
@@ -52,6 +64,113 @@ def test_duplicate_answer():
     assert result == expected, (result, expected)
 
 
+def test_trusted_reads_match_validated_reads():
+    session_id = uuid.uuid4()
+    data = {"floob": "blumble", "country": "England"}
+    interface.api.session.save_answer(session_id=session_id, page_name="country", data=data)
+
+    validated = interface.api.session.get_answer(session_id=session_id, page_name="country")
+    with override_settings(TRUST_INTERNAL_DATA=True):
+        trusted = interface.api.session.get_answer(session_id=session_id, page_name="country")
+    assert trusted == validated == {"country": "England"}, (trusted, validated)
+
+
+def test_session_snapshot_is_updated_on_save():
+    session_id = uuid.uuid4()
+    interface.api.session.save_answer(session_id=session_id, page_name="country", data={"country": "England"})
+    interface.api.session.save_answer(session_id=session_id, page_name="supplier", data={"supplier": "Utilita"})
+    interface.api.session.save_answer(session_id=session_id, page_name="country", data={"country": "Wales"})
+
+    expected = {"country": "Wales", "supplier": "Utilita"}
+    snapshot = models.SessionSnapshot.objects.get(session_id=session_id)
+    assert snapshot.data == expected, (snapshot.data, expected)
+
+    result = interface.api.session.get_session(session_id=session_id)
+    assert result == expected, (result, expected)
+    assert models.Answer.objects.filter(session_id=session_id).count() == 3
+
+
+def test_session_without_snapshot_is_read_from_answers():
+    session_id = uuid.uuid4()
+    models.Answer.objects.create(session_id=session_id, page_name="country", data={"country": "England"})
+    models.Answer.objects.create(session_id=session_id, page_name="supplier", data={"supplier": "Utilita"})
+
+    expected = {"country": "England", "supplier": "Utilita"}
+    result = interface.api.session.get_session(session_id=session_id)
+    assert result == expected, (result, expected)
+    assert not models.SessionSnapshot.objects.filter(session_id=session_id).exists()
+
+    interface.api.session.save_answer(session_id=session_id, page_name="own-property", data={})
+    snapshot = models.SessionSnapshot.objects.get(session_id=session_id)
+    assert snapshot.data == expected, (snapshot.data, expected)
+
+
+def test_session_reads_are_cached_within_a_request():
+    session_id = uuid.uuid4()
+    interface.api.session.save_answer(session_id=session_id, page_name="country", data={"country": "England"})
+
+    session_cache.start_request_cache()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            first = interface.api.session.get_session(session_id=session_id)
+            second = interface.api.session.get_session(session_id=session_id)
+        assert len(queries) == 1, queries.captured_queries
+        assert first == second == {"country": "England"}
+
+        # modifying a result must not change what later reads see
+        first["country"] = "Wales"
+        assert interface.api.session.get_session(session_id=session_id) == {"country": "England"}
+
+        interface.api.session.save_answer(session_id=session_id, page_name="country", data={"country": "Scotland"})
+        assert interface.api.session.get_session(session_id=session_id) == {"country": "Scotland"}
+        assert interface.api.session.get_answer(session_id=session_id, page_name="country") == {"country": "Scotland"}
+    finally:
+        session_cache.end_request_cache()
+
+
+def test_answers_by_page_matches_page_answers():
+    session_id = uuid.uuid4()
+    interface.api.session.save_answer(session_id=session_id, page_name="country", data={"country": "England"})
+    interface.api.session.save_answer(session_id=session_id, page_name="supplier", data={"supplier": "Utilita"})
+    interface.api.session.save_answer(session_id=session_id, page_name="country", data={"country": "Wales"})
+
+    with CaptureQueriesContext(connection) as queries:
+        answers_by_page = session_stores.get_session_store().get_answers_by_page(session_id)
+    assert len(queries) == 1, queries.captured_queries
+
+    assert answers_by_page.keys() == {"country", "supplier"}
+    for page_name, page_answers in answers_by_page.items():
+        expected = interface.api.session.get_page_answers(session_id=session_id, page_name=page_name)
+        assert page_answers == expected, (page_answers, expected)
+
+
+def test_buffered_events_are_written_on_flush():
+    session_id = uuid.uuid4()
+
+    utils_module.start_event_buffer()
+    try:
+        interface.api.session.save_answer(session_id=session_id, page_name="country", data={"country": "England"})
+        interface.api.session.save_answer(session_id=session_id, page_name="country", data={"country": "Wales"})
+        assert not models.Event.objects.filter(data__session_id=str(session_id)).exists()
+    finally:
+        utils_module.end_event_buffer()
+
+    events = models.Event.objects.filter(data__session_id=str(session_id))
+    assert events.count() == 2
+    assert [event.data["data"]["country"] for event in events.order_by("created_at")] == ["England", "Wales"]
+
+
+def test_discarded_events_are_not_written():
+    session_id = uuid.uuid4()
+
+    utils_module.start_event_buffer()
+    interface.api.session.save_answer(session_id=session_id, page_name="country", data={"country": "England"})
+    utils_module.end_event_buffer(flush=False)
+
+    assert not models.Event.objects.filter(data__session_id=str(session_id)).exists()
+    assert models.Answer.objects.filter(session_id=session_id).exists()
+
+
 @unittest.mock.patch("help_to_heat.frontdoor.interface.OSApi", MockOSApi)
 def test_find_addresses():
     result = interface.api.address.find_addresses("10", "sw1a 2aa")
@@ -64,10 +183,29 @@ def test_get_address():
     assert result["address"] == "10, DOWNING STREET, LONDON, CITY OF WESTMINSTER, SW1A 2AA"
 
 
+class NoUprnLookupOSApi(MockOSApi):
+    def get_by_uprn(self, uprn, dataset):
+        raise AssertionError("The address should have come from the postcode search")
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.OSApi", NoUprnLookupOSApi)
+def test_find_addresses_includes_full_address():
+    result = interface.api.address.find_addresses("10", "SW1A 2AA")
+    assert result[0]["address"] == "10, DOWNING STREET, LONDON, CITY OF WESTMINSTER, SW1A 2AA"
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.OSApi", NoUprnLookupOSApi)
+def test_get_address_from_cached_postcode_search():
+    interface.api.address.find_addresses("10", "SW1A 2AA")
+
+    result = interface.api.address.get_address(uprn="100023336956", postcode="sw1a 2aa")
+    assert result["address"] == "10, DOWNING STREET, LONDON, CITY OF WESTMINSTER, SW1A 2AA"
+
+
 @unittest.mock.patch("help_to_heat.frontdoor.interface.EPCApi", MockEPCApi)
 def test_get_epc():
     assert interface.api.epc.get_address_and_epc_lmk("22", "FL23 4JA")
-    found_epc, _ = interface.api.epc.get_epc("1111111111111111111111111111111111")
+    found_epc = interface.api.epc.get_epc_details("1111111111111111111111111111111111")
     assert found_epc.get("current-energy-rating").upper() == "G"
 
 
@@ -95,7 +233,7 @@ def test_get_epc_unauthorized_failure():
 @utils.mock_os_api
 def test_get_epc_details_not_found_failure():
     try:
-        interface.api.epc.get_epc("1111111111111111111111111111111111")
+        interface.api.epc.get_epc_details("1111111111111111111111111111111111")
         raise "Expected call to throw"
     except requests.exceptions.RequestException as e:
         assert e.response.status_code == HTTPStatus.NOT_FOUND
@@ -105,7 +243,113 @@ def test_get_epc_details_not_found_failure():
 @utils.mock_os_api
 def test_get_epc_details_unauthorized_failure():
     try:
-        interface.api.epc.get_epc("1111111111111111111111111111111111")
+        interface.api.epc.get_epc_details("1111111111111111111111111111111111")
         raise "Expected call to throw"
     except requests.exceptions.RequestException as e:
         assert e.response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.EPCApi", MockEPCApi)
+def test_get_epc_details_closes_every_connection():
+    with unittest.mock.patch.object(interface.connections, "close_all") as close_all:
+        interface.api.epc.get_epc_details("1111111111111111111111111111111111")
+    assert close_all.called
+
+
+class SlowRecommendationsEPCApi(MockEPCApi):
+    recommendations_released = threading.Event()
+
+    def get_epc_recommendations(self, lmk_key):
+        self.recommendations_released.wait(timeout=5)
+        return super().get_epc_recommendations(lmk_key)
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.EPCApi", SlowRecommendationsEPCApi)
+@override_settings(EPC_RECOMMENDATIONS_FETCH_POLICY="background")
+def test_recommendations_are_fetched_in_the_background():
+    session_id = uuid.uuid4()
+    lmk = "1111111111111111111111111111111111"
+    interface.api.session.save_answer(session_id, "epc-select", {"lmk": lmk, "recommendations": []})
+    SlowRecommendationsEPCApi.recommendations_released.clear()
+
+    interface.api.epc.schedule_recommendations(session_id, lmk)
+    assert interface.api.session.get_page_answers(session_id, "epc-select")["recommendations"] == []
+
+    SlowRecommendationsEPCApi.recommendations_released.set()
+    _wait_for(lambda: interface.api.session.get_page_answers(session_id, "epc-select")["recommendations"])
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.EPCApi", SlowRecommendationsEPCApi)
+@override_settings(EPC_RECOMMENDATIONS_FETCH_POLICY="background")
+def test_recommendations_dont_overwrite_later_answers():
+    session_id = uuid.uuid4()
+    lmk = "1111111111111111111111111111111111"
+    interface.api.session.save_answer(
+        session_id, "epc-select", {"lmk": lmk, "uprn": "100000000001", "address": "1 Acacia Avenue"}
+    )
+    SlowRecommendationsEPCApi.recommendations_released.clear()
+
+    interface.api.epc.schedule_recommendations(session_id, lmk)
+    interface.api.session.save_answer(session_id, "epc-select", {"lmk": lmk, "uprn": "100000000001", "address": "1A"})
+
+    SlowRecommendationsEPCApi.recommendations_released.set()
+    _wait_for(lambda: interface.api.session.get_page_answers(session_id, "epc-select").get("recommendations"))
+    assert interface.api.session.get_session(session_id)["address"] == "1A"
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.EPCApi", MockEPCApi)
+def test_recommendations_for_another_address_are_not_saved():
+    session_id = uuid.uuid4()
+    lmk = "1111111111111111111111111111111111"
+    interface.api.session.save_answer(session_id, "epc-select", {"lmk": lmk, "uprn": "100000000001"})
+    interface.api.session.save_answer(session_id, "address-select", {"uprn": "100000000002"})
+
+    interface.api.epc.schedule_recommendations(session_id, lmk)
+
+    assert "recommendations" not in interface.api.session.get_page_answers(session_id, "epc-select")
+
+
+@override_settings(EPC_RECOMMENDATIONS_FETCH_POLICY="background")
+def test_background_recommendations_errors_are_logged(caplog):
+    with unittest.mock.patch.object(interface.EPC, "_fetch_recommendations", side_effect=KeyError("lmk")):
+        interface.api.epc.schedule_recommendations(uuid.uuid4(), "1111111111111111111111111111111111")
+        _wait_for(lambda: "Unable to save EPC recommendations" in caplog.text)
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.EPCApi", MockEPCApi)
+@override_settings(EPC_RECOMMENDATIONS_FETCH_POLICY="background")
+def test_background_recommendations_close_every_connection():
+    with unittest.mock.patch.object(interface.connections, "close_all") as close_all:
+        interface.api.epc.schedule_recommendations(uuid.uuid4(), "1111111111111111111111111111111111")
+        _wait_for(lambda: close_all.called)
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.EPCApi", MockEPCApi)
+def test_recommendations_are_added_to_a_submitted_referral():
+    session_id = uuid.uuid4()
+    lmk = "222222222222222222222222222222222"
+    interface.api.session.save_answer(session_id, "epc-select", {"lmk": lmk, "recommendations": []})
+    utils.create_referral(session_id)
+
+    interface.api.epc.schedule_recommendations(session_id, lmk)
+
+    referral = portal.models.Referral.objects.get(session_id=session_id)
+    assert referral.data["recommendations"]
+    assert interface.api.session.get_page_answers(session_id, "epc-select")["recommendations"]
+
+
+@unittest.mock.patch("help_to_heat.frontdoor.interface.EPCApi", MockEPCApi)
+def test_recommendations_for_another_lmk_are_not_saved():
+    session_id = uuid.uuid4()
+    interface.api.session.save_answer(session_id, "epc-select", {"lmk": "another lmk", "recommendations": []})
+
+    interface.api.epc.schedule_recommendations(session_id, "1111111111111111111111111111111111")
+
+    assert interface.api.session.get_page_answers(session_id, "epc-select")["recommendations"] == []
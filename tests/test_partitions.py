@@ -0,0 +1,55 @@
+import datetime
+import uuid
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, connections
+
+from help_to_heat.frontdoor import interface, models, partitions
+
+
+@pytest.mark.skipif(not partitions.is_partitioned("frontdoor_answer"), reason="only partitioned on postgres")
+def test_create_partition_moves_rows_from_default():
+    month_start = datetime.datetime(2100, 1, 1, tzinfo=datetime.timezone.utc)
+    session_id = uuid.uuid4()
+    interface.api.session.save_answer(session_id=session_id, page_name="country", data={"country": "England"})
+    models.Answer.objects.filter(session_id=session_id).update(created_at=month_start + datetime.timedelta(days=3))
+
+    try:
+        name = partitions.create_partition("frontdoor_answer", month_start)
+        assert name == "frontdoor_answer_p2100_01"
+        assert partitions.create_partition("frontdoor_answer", month_start) is None
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT session_id FROM {name}")
+            assert cursor.fetchall() == [(session_id,)]
+            cursor.execute("SELECT COUNT(*) FROM frontdoor_answer_default WHERE session_id = %s", [session_id])
+            assert cursor.fetchone() == (0,)
+
+        result = interface.api.session.get_answer(session_id=session_id, page_name="country")
+        assert result == {"country": "England"}
+    finally:
+        models.Answer.objects.filter(session_id=session_id).delete()
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS frontdoor_answer_p2100_01")
+
+
+def test_add_months():
+    month_start = datetime.datetime(2024, 11, 1, tzinfo=datetime.timezone.utc)
+    assert partitions.add_months(month_start, 2) == datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    assert partitions.add_months(month_start, -11) == datetime.datetime(2023, 12, 1, tzinfo=datetime.timezone.utc)
+
+
+@pytest.mark.skipif(not partitions.is_partitioned("frontdoor_answer"), reason="only partitioned on postgres")
+def test_manage_partitions_releases_its_lock():
+    call_command("manage_partitions", "--months-ahead", "0")
+
+    # another container starting now can take the lock straight away
+    other_connection = connections.create_connection("default")
+    try:
+        with other_connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", ["manage_partitions"])
+            assert cursor.fetchone() == (True,)
+            cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", ["manage_partitions"])
+    finally:
+        other_connection.close()
@@ -1,3 +1,7 @@
+from django.contrib.auth.models import AnonymousUser
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
 from . import utils
 
 
@@ -66,3 +70,16 @@ def test_service_manager_add_supplier():
     page = form.submit().follow()
 
     assert page.has_one(f"""th:contains("{team_lead_name} v2") ~ td:nth-of-type(2):contains("Disabled")""")
+
+
+def test_epc_uploads_page_refreshes_while_loading():
+    request = RequestFactory().get("/portal/epc-uploads/")
+    request.user = AnonymousUser()
+
+    html = render_to_string("portal/epc-page.html", {"load_runs": [], "is_loading": True}, request=request)
+    head, body = html.split("</head>")
+    assert 'http-equiv="refresh"' in head
+    assert 'http-equiv="refresh"' not in body
+
+    html = render_to_string("portal/epc-page.html", {"load_runs": [], "is_loading": False}, request=request)
+    assert 'http-equiv="refresh"' not in html
@@ -0,0 +1,83 @@
+import csv
+
+import pytest
+
+from help_to_heat import portal
+from help_to_heat.frontdoor import interface
+from help_to_heat.portal import epc_writer
+
+
+@pytest.fixture(autouse=True)
+def reset_scottish_epcs():
+    portal.models.ScottishEpcRating.objects.all().delete()
+    yield
+    portal.models.ScottishEpcRating.objects.all().delete()
+
+
+def _make_row(uprn, rating, date, **values):
+    row = {column: "" for column in epc_writer.scottish_epc_columns}
+    row.update(
+        OSG_REFERENCE_NUMBER=uprn,
+        CURRENT_ENERGY_RATING=rating,
+        LODGEMENT_DATE=date,
+        ADDRESS1=f"{uprn[-1:]} Royal Mile",
+        POSTCODE="EH1 1AA",
+        IMPROVEMENTS="Loft insulation",
+    )
+    row.update(values)
+    return row
+
+
+def _write_csv(path, rows):
+    fieldnames = ["EXTRA_COLUMN", *epc_writer.scottish_epc_columns]
+    with path.open("w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames, restval="")
+        writer.writeheader()
+        writer.writerow({column: f"Description of {column}" for column in fieldnames})
+        writer.writerows(rows)
+
+
+def test_load_scottish_epcs_keeps_latest_certificate(tmp_path):
+    _write_csv(
+        tmp_path / "scottish-epcs.csv",
+        [
+            _make_row("100000000001", "C", "2021-03-04", ALTERNATIVE_IMPROVEMENTS="Solar panels"),
+            _make_row("100000000002", "E", "2016-01-02"),
+            _make_row("100000000001", "D", "2015-01-02"),
+            _make_row("", "A", "2022-01-02"),
+        ],
+    )
+
+    epc_writer.write_scottish_epcs(epc_writer.read_scottish_epc_rows(tmp_path / "scottish-epcs.csv"), batch_size=2)
+
+    ratings = {epc.uprn: (epc.rating, str(epc.date)) for epc in portal.models.ScottishEpcRating.objects.all()}
+    assert ratings == {"100000000001": ("C", "2021-03-04"), "100000000002": ("E", "2016-01-02")}
+    epc = portal.models.ScottishEpcRating.objects.get(uprn="100000000002")
+    assert epc.address2 == ""
+
+    found_epc = interface.api.epc.get_epc_scotland("100000000001")
+    assert found_epc["address1"] == "1 Royal Mile"
+    assert found_epc["improvements"] == "Loft insulation|| Alternatives: Solar panels"
+
+
+def test_reload_scottish_epcs_only_replaces_older_certificates(tmp_path):
+    _write_csv(tmp_path / "scottish-epcs.csv", [_make_row("100000000001", "C", "2021-03-04")])
+    epc_writer.write_scottish_epcs(epc_writer.read_scottish_epc_rows(tmp_path / "scottish-epcs.csv"))
+
+    _write_csv(
+        tmp_path / "scottish-epcs.csv",
+        [_make_row("100000000001", "G", "2019-01-02"), _make_row("100000000002", "B", "")],
+    )
+    epc_writer.write_scottish_epcs(epc_writer.read_scottish_epc_rows(tmp_path / "scottish-epcs.csv"))
+
+    ratings = {epc.uprn: (epc.rating, epc.date) for epc in portal.models.ScottishEpcRating.objects.all()}
+    assert ratings["100000000001"][0] == "C"
+    assert ratings["100000000002"] == ("B", None)
+
+
+def test_read_scottish_epc_rows_needs_every_column(tmp_path):
+    path = tmp_path / "scottish-epcs.csv"
+    path.write_text("OSG_REFERENCE_NUMBER,CURRENT_ENERGY_RATING\n")
+
+    with pytest.raises(ValueError, match="LODGEMENT_DATE"):
+        list(epc_writer.read_scottish_epc_rows(path))
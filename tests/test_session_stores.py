@@ -0,0 +1,41 @@
+import uuid
+
+import pytest
+
+from help_to_heat.frontdoor import session_stores
+
+stores = (
+    session_stores.AnswerLogSessionStore,
+    session_stores.SnapshotSessionStore,
+    session_stores.LocalSessionStore,
+)
+
+
+@pytest.mark.parametrize("store_class", stores)
+def test_session_store(store_class):
+    store = store_class()
+    session_id = uuid.uuid4()
+    assert store.get_answer(session_id, "country") == {}
+    assert store.get_session(session_id) == {}
+
+    store.save_answer(session_id, "country", {"country": "England"})
+    store.save_answer(session_id, "supplier", {"supplier": "Utilita", "user_selected_supplier": "Utilita"})
+    store.save_answer(session_id, "supplier", {"supplier": "Octopus Energy"})
+
+    assert store.get_answer(session_id, "supplier") == {"supplier": "Octopus Energy"}
+    expected_page_answers = {"supplier": "Octopus Energy", "user_selected_supplier": "Utilita"}
+    assert store.get_page_answers(session_id, "supplier") == expected_page_answers
+    assert store.get_answers_by_page(session_id) == {
+        "country": {"country": "England"},
+        "supplier": expected_page_answers,
+    }
+    assert store.get_session(session_id) == {"country": "England", **expected_page_answers}
+
+
+def test_session_store_must_implement_every_method():
+    class PartialSessionStore(session_stores.SessionStore):
+        def save_answer(self, session_id, page_name, data):
+            return data
+
+    with pytest.raises(TypeError):
+        PartialSessionStore()
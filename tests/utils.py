@@ -179,3 +179,5 @@ def create_referral(session_id, data=None, supplier="British Gas", creation_time
 
 def delete_answer_in_session(session_id, page_name):
     frontdoor.models.Answer.objects.get(session_id=session_id, page_name=page_name).delete()
+    # the snapshot would still include the deleted answer, without it the session is read from the remaining answers
+    frontdoor.models.SessionSnapshot.objects.filter(session_id=session_id).delete()